@@ -1,10 +1,23 @@
-import streamlit as st
+import metricas
+with metricas.fase_arranque('import streamlit'):
+    import streamlit as st
 print("🚀 INICIANDO APP DE STREAMLIT...") # Debug log
-import pandas as pd
-from backend import PadelDB
+with metricas.fase_arranque('import backend'):
+    from backend import PadelDB, Conflicto, calcular_cambios, hay_cambios, fechas_cambiadas, fusionar_disponibles, partido_terminado
+import tarjetas
+import perfilado
+import sesiones
+import memoria
+import ligas
 from datetime import datetime, timedelta
-import pytz
+with metricas.fase_arranque('import pytz'):
+    import pytz
 import time
+import os
+import hashlib
+import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 
 # --- CONFIGURACIÓN DE PÁGINA ---
 st.set_page_config(
@@ -14,376 +27,91 @@ st.set_page_config(
 )
 
 # --- CSS PREMIUM MINIMAL ---
-st.markdown("""
-<style>
-    /* === FONTS === */
-    @import url('https://fonts.googleapis.com/css2?family=Plus+Jakarta+Sans:wght@400;500;600;700;800&display=swap');
-    @import url('https://fonts.googleapis.com/icon?family=Material+Icons+Round');
-    
-    /* Material Icons Class */
-    .material-icons-round {
-        font-family: 'Material Icons Round';
-        font-weight: normal;
-        font-style: normal;
-        font-size: 20px;
-        display: inline-block;
-        line-height: 1;
-        text-transform: none;
-        letter-spacing: normal;
-        word-wrap: normal;
-        white-space: nowrap;
-        direction: ltr;
-        vertical-align: middle;
-        -webkit-font-smoothing: antialiased;
-        text-rendering: optimizeLegibility;
-        -moz-osx-font-smoothing: grayscale;
-        font-feature-settings: 'liga';
-    }
+# El tema vive en static/theme.css y se sirve una sola vez (enableStaticServing);
+# la URL lleva la versión para que el navegador lo cachee sin quedarse con uno viejo.
+@st.cache_data
+def version_css():
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "theme.css"), "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()[:10]
 
-    /* === VARIABLES === */
-    :root {
-        --primary: #1E88E5;       /* Padel Blue - Court color */
-        --primary-light: #e3f2fd;
-        --primary-dark: #1565C0;
-        --accent: #D4D700;        /* Padel Yellow - Ball color (softened) */
-        --accent-light: #f7f8cc;
-        --success: #10b981;
-        --warning: #f59e0b;
-        --danger: #ef4444;
-        --bg: #f8fafc;
-        --bg-card: #ffffff;
-        --text: #0f172a;
-        --text-muted: #64748b;
-        --border: #e2e8f0;
-        --shadow: 0 1px 3px 0 rgb(0 0 0 / 0.1);
-        --shadow-md: 0 4px 6px -1px rgb(0 0 0 / 0.1);
-        --shadow-lg: 0 10px 15px -3px rgb(0 0 0 / 0.1);
-        --radius: 10px;
-        --radius-lg: 14px;
-    }
+st.markdown(f'<link rel="stylesheet" href="app/static/theme.css?v={version_css()}">', unsafe_allow_html=True)
 
-    /* === BASE === */
-    .stApp {
-        background-color: var(--bg) !important;
-    }
-    
-    /* Hide Streamlit Chrome */
-    header[data-testid="stHeader"] { display: none !important; }
-    footer { visibility: hidden; }
-    .stDeployButton { display: none; }
-    #MainMenu { visibility: hidden; }
-    
-    .block-container {
-        padding: 1rem 1rem 6rem 1rem !important;
-        max-width: 480px !important;
-        margin: 0 auto !important;
-    }
+# --- LISTA DE HORAS ---
+OPCIONES_HORAS = [
+    "15:00", "15:30", "16:00", "16:30", "17:00", "17:30", 
+    "18:00", "18:30", "19:00", "19:30", "20:00", "20:30", 
+    "21:00", "21:30", "22:00", "22:30", "23:00"
+]
 
-    /* === TYPOGRAPHY === */
-    * {
-        font-family: 'Plus Jakarta Sans', -apple-system, BlinkMacSystemFont, sans-serif !important;
-    }
-    
-    h1, h2, h3 {
-        font-weight: 700 !important;
-        color: var(--text) !important;
-        letter-spacing: -0.025em !important;
-    }
-    
-    h1 { font-size: 1.875rem !important; }
-    h2 { font-size: 1.5rem !important; }
-    h3 { font-size: 1.125rem !important; }
-    
-    p, span, div, label {
-        color: var(--text);
-        line-height: 1.5;
-    }
-    
-    .text-muted {
-        color: var(--text-muted) !important;
-    }
+# --- PREFETCH DE PARTIDOS ---
+# Los partidos se descargan en segundo plano desde el login para que el
+# calendario (que solo necesita get_mis_horas) se pinte sin esperarlos.
+# cargar_panel lanza a la vez todas las lecturas del panel; get_mis_horas del
+# calendario se suma a la que ya esté en curso en lugar de repetirla.
+@st.cache_resource
+def pool_prefetch():
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="prefetch")
 
-    /* === CARDS === */
-    div[data-testid="stVerticalBlockBorderWrapper"] > div {
-        background: var(--bg-card) !important;
-        border: 1px solid var(--border) !important;
-        border-radius: var(--radius) !important;
-        box-shadow: var(--shadow) !important;
-        padding: 0.65rem 0.75rem !important;
-        transition: all 0.2s ease !important;
-    }
-    
-    div[data-testid="stVerticalBlockBorderWrapper"] > div:hover {
-        box-shadow: var(--shadow-md) !important;
-        border-color: var(--primary-light) !important;
-    }
+def cargar_partidos(db, user_id, nivel):
+    """Datos de las secciones de partidos (se ejecuta fuera del hilo del script)."""
+    metricas.pantalla('partidos')
+    return db.cargar_panel(user_id, nivel)
 
-    /* === BUTTONS === */
-    .stButton > button {
-        width: 100% !important;
-        background: var(--accent) !important;
-        color: #1a1a1a !important;
-        border: none !important;
-        border-radius: var(--radius) !important;
-        padding: 0.875rem 1.5rem !important;
-        font-weight: 600 !important;
-        font-size: 0.9375rem !important;
-        letter-spacing: -0.01em !important;
-        box-shadow: var(--shadow) !important;
-        transition: all 0.2s cubic-bezier(0.4, 0, 0.2, 1) !important;
-    }
-    
-    .stButton > button:hover {
-        background: #c4c900 !important;
-        transform: translateY(-1px) !important;
-        box-shadow: var(--shadow-md) !important;
-    }
-    
-    .stButton > button:active {
-        transform: translateY(0) !important;
-    }
-    
-    /* Yellow Spinner - comprehensive selectors */
-    .stSpinner > div,
-    .stSpinner > div > div,
-    .stSpinner svg circle,
-    [data-testid="stSpinner"] > div,
-    [data-testid="stSpinner"] svg,
-    div[data-testid="stMarkdownContainer"] + div svg circle {
-        stroke: #D4D700 !important;
-        border-color: #D4D700 !important;
-        border-top-color: #D4D700 !important;
-    }
-    /* Dialog/Modal spinner */
-    [data-testid="stModal"] .stSpinner > div,
-    [role="dialog"] .stSpinner svg circle {
-        stroke: #D4D700 !important;
-    }
-    
-    /* Secondary Button (default) */
-    .stButton > button[kind="secondary"] {
-        background: transparent !important;
-        color: var(--text-muted) !important;
-        box-shadow: none !important;
-        border: 1px solid var(--border) !important;
-    }
-    
-    .stButton > button[kind="secondary"]:hover {
-        background: var(--bg) !important;
-        color: var(--text) !important;
-    }
+def iniciar_prefetch(user_id, nivel):
+    """Lanza la descarga de partidos si no hay ya una en curso."""
+    if st.session_state.get('prefetch_partidos') is None:
+        st.session_state.prefetch_partidos = pool_prefetch().submit(cargar_partidos, st.session_state.db, user_id, nivel)
 
-    /* === TOGGLE === */
-    .stToggle > label {
-        font-weight: 600 !important;
-        font-size: 0.9375rem !important;
-    }
-    
-    .stToggle div[role="switch"] {
-        background-color: #cbd5e1 !important;
-    }
-    
-    .stToggle div[role="switch"][aria-checked="true"] {
-        background-color: var(--accent) !important;
-    }
+# --- MANTENIMIENTO PERIÓDICO ---
+# Archivar la disponibilidad pasada como mucho una vez al día por proceso,
+# materializar el registro de eventos una vez por hora y pasar a JUGADO los
+# partidos terminados cada cuarto de hora: la caché de recursos guarda el
+# Future por fecha / hora / cuarto y liga. A mano: python mantenimiento.py
+@st.cache_resource(max_entries=ligas.MAXIMO)
+def mantenimiento_diario(fecha, liga, _db):
+    return pool_prefetch().submit(_db.archivar_disponibilidad, fecha)
 
-    /* === SLIDER === */
-    .stSlider {
-        padding: 0 !important;
-    }
-    .stSlider > div > div > div[data-baseweb="slider"] {
-        padding: 0.5rem 0 !important;
-    }
-    .stSlider [data-testid="stTickBarMin"], 
-    .stSlider [data-testid="stTickBarMax"] {
-        font-size: 0.75rem !important;
-        font-weight: 600 !important;
-        color: var(--primary) !important;
-    }
-    /* Slider Track - Blue */
-    .stSlider div[data-baseweb="slider"] div[role="slider"] {
-        background: var(--accent) !important;
-        border: 2px solid white !important;
-        box-shadow: var(--shadow-md) !important;
-    }
+@st.cache_resource(max_entries=ligas.MAXIMO)
+def materializacion_horaria(hora, liga, _db):
+    return pool_prefetch().submit(_db.materializar_disponibilidad)
 
-    /* === TABS === */
-    .stTabs [data-baseweb="tab-list"] {
-        gap: 0.2rem !important;
-        background: transparent !important;
-        padding: 0 !important;
-        border-radius: var(--radius) !important;
-        display: inline-flex !important;
-        width: auto !important;
-    }
-    
-    /* Hide the tab line/border */
-    .stTabs [data-baseweb="tab-highlight"],
-    .stTabs [data-baseweb="tab-border"] {
-        display: none !important;
-    }
-    
-    .stTabs [data-baseweb="tab"] {
-        border-radius: 8px !important;
-        padding: 0.35rem 0.5rem !important;
-        font-weight: 600 !important;
-        font-size: 0.65rem !important;
-        color: #64748b !important;
-        background: #e2e8f0 !important;
-        white-space: nowrap !important;
-    }
-    
-    .stTabs [aria-selected="true"] {
-        background: var(--accent) !important;
-        color: #1a1a1a !important;
-        box-shadow: var(--shadow) !important;
-    }
+@st.cache_resource(max_entries=ligas.MAXIMO)
+def jugados_por_cuarto(cuarto, liga, _db):
+    return pool_prefetch().submit(_db.marcar_jugados)
 
-    /* === EXPANDER === */
-    div[data-testid="stExpander"] {
-        background: transparent !important;
-        border: none !important;
-    }
-    
-    div[data-testid="stExpander"] details > summary {
-        background: var(--bg-card) !important;
-        border: 1px solid var(--border) !important;
-        border-radius: var(--radius) !important;
-        padding: 1rem !important;
-        font-weight: 600 !important;
-        color: var(--text) !important;
-    }
-    
-    /* Fix expander icon */
-    div[data-testid="stExpander"] details > summary svg {
-        display: inline-block !important;
-    }
-    /* CRITICAL FIX: Force expander text to not use Material Icons font */
-    div[data-testid="stExpander"] details > summary {
-        font-family: 'Plus Jakarta Sans', sans-serif !important;
-    }
-    div[data-testid="stExpander"] details > summary span {
-        font-family: 'Plus Jakarta Sans', sans-serif !important;
-    }
-    div[data-testid="stExpander"] details > summary p {
-        font-family: 'Plus Jakarta Sans', sans-serif !important;
-    }
+# --- HISTORIAL ---
+HISTORIAL_POR_PAGINA = 10
 
-    /* === INPUTS === */
-    .stTextInput > div > div > input {
-        border-radius: var(--radius) !important;
-        border: 1px solid var(--border) !important;
-        padding: 0.75rem 1rem !important;
-        font-size: 1rem !important;
-    }
-    
-    .stTextInput > div > div > input:focus {
-        border-color: var(--primary) !important;
-        box-shadow: 0 0 0 3px var(--primary-light) !important;
-    }
-    
-    /* Hide form submit helper text - AGGRESSIVE */
-    .stForm small {
-        display: none !important;
-        visibility: hidden !important;
-        height: 0 !important;
-        overflow: hidden !important;
-    }
-    /* Hide the "Press Enter to submit" caption specifically */
-    .stForm [class*="InputInstructions"],
-    .stForm [class*="instructions"],
-    div[data-testid="InputInstructions"],
-    .stForm p:has(+ button),
-    .stForm div[data-baseweb="form-control-container"] > div:last-child:not(:first-child) {
-        display: none !important;
-        visibility: hidden !important;
-    }
-    /* Hide any text with "Enter" */
-    .stForm *[class*="Caption"] {
-        display: none !important;
-    }
-
-    /* === SUCCESS/ERROR STATES === */
-    .stSuccess {
-        background: #ecfdf5 !important;
-        border: 1px solid #a7f3d0 !important;
-        border-radius: var(--radius) !important;
-        color: #065f46 !important;
-    }
-    
-    .stError {
-        background: #fef2f2 !important;
-        border: 1px solid #fecaca !important;
-        border-radius: var(--radius) !important;
-        color: #991b1b !important;
-    }
-
-    /* === ANIMATIONS === */
-    @keyframes fadeIn {
-        from { opacity: 0; transform: translateY(8px); }
-        to { opacity: 1; transform: translateY(0); }
-    }
-    
-    @keyframes pulse {
-        0%, 100% { opacity: 1; }
-        50% { opacity: 0.7; }
-    }
-    
-    .element-container {
-        animation: fadeIn 0.3s ease-out backwards;
-    }
-    
-    /* Stagger animation */
-    .element-container:nth-child(1) { animation-delay: 0.05s; }
-    .element-container:nth-child(2) { animation-delay: 0.1s; }
-    .element-container:nth-child(3) { animation-delay: 0.15s; }
-    .element-container:nth-child(4) { animation-delay: 0.2s; }
-    .element-container:nth-child(5) { animation-delay: 0.25s; }
-
-    /* === CUSTOM CLASSES === */
-    .badge {
-        display: inline-block;
-        padding: 0.25rem 0.75rem;
-        border-radius: 9999px;
-        font-size: 0.75rem;
-        font-weight: 700;
-        text-transform: uppercase;
-        letter-spacing: 0.05em;
-    }
-    
-    .badge-primary {
-        background: var(--primary-light);
-        color: var(--primary-dark);
-    }
-    
-    .badge-success {
-        background: #dcfce7;
-        color: #166534;
-    }
-    
-    .badge-muted {
-        background: var(--bg);
-        color: var(--text-muted);
+# --- CSS BOTÓN AZUL (tarjetas de partidos) ---
+CSS_BOTON_AZUL = """
+    <style>
+    div[data-testid="stButton"] > button[kind="primary"] {
+        background-color: #1E88E5 !important;
+        color: white !important;
+        border: none !important;
     }
-    
-    .divider {
-        height: 1px;
-        background: var(--border);
-        margin: 1rem 0;
+    div[data-testid="stButton"] > button[kind="primary"]:hover {
+        background-color: #1565C0 !important;
     }
-</style>
-""", unsafe_allow_html=True)
+    </style>
+"""
 
-# --- LISTA DE HORAS ---
-OPCIONES_HORAS = [
-    "15:00", "15:30", "16:00", "16:30", "17:00", "17:30", 
-    "18:00", "18:30", "19:00", "19:30", "20:00", "20:30", 
-    "21:00", "21:30", "22:00", "22:30", "23:00"
-]
+def selector_partido(partidos, key):
+    """Devuelve el partido sobre el que actúa el botón de la sección (selector solo si hay varios)."""
+    if len(partidos) == 1:
+        return partidos[0]
+    idx = st.selectbox(
+        "Partido",
+        range(len(partidos)),
+        format_func=lambda i: partidos[i].get('titulo', partidos[i].get('id_partido', '')),
+        key=key,
+        label_visibility="collapsed"
+    )
+    return partidos[idx]
 
 # --- POPUP DE GUARDADO ---
 @st.dialog("Guardando", width="small")
-def popup_guardando(db, user_id, user_nombre, id_grupo, slots):
+def popup_guardando(db, user_id, user_nombre, id_grupo, cambios):
     placeholder = st.empty()
     
     if st.session_state.get('guardado_exito', False):
@@ -413,9 +141,14 @@ def popup_guardando(db, user_id, user_nombre, id_grupo, slots):
         """, unsafe_allow_html=True)
     
     try:
-        db.guardar_disponibilidad(user_id, id_grupo, slots)
-        st.session_state.mis_slots_cache = slots
-        st.session_state.needs_match_refresh = True
+        db.guardar_cambios_disponibilidad(user_id, id_grupo, cambios)
+        # Aplicar el delta al modelo local y refrescar solo las fechas afectadas
+        mis_slots = st.session_state.mis_slots_cache
+        for fecha in cambios['bajas']:
+            mis_slots.pop(fecha, None)
+        mis_slots.update(cambios['altas'])
+        mis_slots.update(cambios['cambios'])
+        st.session_state.fechas_refresco = st.session_state.get('fechas_refresco', set()) | fechas_cambiadas(cambios)
         st.session_state.guardado_exito = True
         time.sleep(0.5)
         st.rerun()
@@ -437,19 +170,30 @@ def popup_guardando(db, user_id, user_nombre, id_grupo, slots):
             st.session_state.mostrar_popup_guardado = False
             st.rerun()
 
-def crear_registro_disponibilidad(fecha_str, hora_inicio_str, hora_fin_str):
-    return {
-        'fecha': fecha_str,
-        'hora_inicio': hora_inicio_str,
-        'hora_fin': hora_fin_str
-    }
+def aviso_cambio_partido(resultado):
+    """
+    Muestra el aviso si confirmar/editar/cancelar no se ha aplicado (otro jugador
+    cambió el partido antes, o error). Devuelve True si el cambio se aplicó.
+    """
+    if resultado:
+        return True
+    if isinstance(resultado, Conflicto):
+        if resultado.estado == 'PROGRAMADO':
+            st.warning(f"Otro jugador ya ha programado este partido para el {resultado.fecha} a las {resultado.hora}.")
+        elif resultado.estado == 'PENDIENTE':
+            st.warning("Otro jugador ha cancelado este partido: vuelve a estar pendiente.")
+        else:
+            st.warning("Otro jugador ha cambiado este partido. Revisa la lista actualizada.")
+    else:
+        st.error("No se pudo guardar. Inténtalo de nuevo.")
+    return False
 
 # --- POPUP DE CONFIRMAR PARTIDO ---
 @st.dialog("Confirmar partido", width="small")
 def popup_confirmar_partido(partido):
     """
     Popup para seleccionar día y hora del partido.
-    partido: dict con 'id_partido', 'titulo', 'nombres_str', 'coincidencias'
+    partido: dict con 'id_partido', 'titulo', 'nombres', 'coincidencias'
     """
     coincidencias = partido.get('coincidencias', [])
     
@@ -457,14 +201,8 @@ def popup_confirmar_partido(partido):
         st.error("No hay fechas disponibles")
         return
     
-    # Separar jugadores en 4 líneas (igual que las tarjetas)
-    nombres_str = partido.get('nombres_str', '')
-    try:
-        eq1, eq2 = nombres_str.split(" vs ")
-        j1, j2 = eq1.split("/")
-        j3, j4 = eq2.split("/")
-    except:
-        j1, j2, j3, j4 = nombres_str, "", "", ""
+    # Jugadores en 4 líneas (igual que las tarjetas)
+    j1, j2, j3, j4 = tarjetas.jugadores(partido)
     
     st.markdown(f"""
         <div style='text-align: center; margin-bottom: 1rem;'>
@@ -578,16 +316,18 @@ def popup_confirmar_partido(partido):
             st.rerun()
     with col2:
         if st.button("✓ Confirmar", type="primary", use_container_width=True):
-            # Guardar en BD
-            st.session_state.db.confirmar_partido(
+            # Guardar en BD (solo si el partido sigue como lo ve el jugador)
+            resultado = st.session_state.db.confirmar_partido(
                 partido['id_partido'],
                 fecha_seleccionada['fecha'],
-                hora_seleccionada
+                hora_seleccionada,
+                version=partido.get('version')
             )
             st.session_state.partido_confirmar = None
             st.session_state.needs_match_refresh = True
-            st.success("¡Partido programado!")
-            time.sleep(1)
+            if aviso_cambio_partido(resultado):
+                st.success("¡Partido programado!")
+            time.sleep(1 if resultado else 3)
             st.rerun()
 
 # --- POPUP DE EDITAR PARTIDO PROGRAMADO ---
@@ -595,14 +335,8 @@ def popup_confirmar_partido(partido):
 def popup_editar_partido(partido):
     """Popup para editar horario o cancelar un partido programado."""
     
-    # Separar jugadores para mostrar en 4 líneas
-    nombres_str = partido.get('nombres_str', '')
-    try:
-        eq1, eq2 = nombres_str.split(" vs ")
-        j1, j2 = eq1.split("/")
-        j3, j4 = eq2.split("/")
-    except:
-        j1, j2, j3, j4 = nombres_str, "", "", ""
+    # Jugadores en 4 líneas
+    j1, j2, j3, j4 = tarjetas.jugadores(partido)
     
     st.markdown(f"""
         <div style='text-align: center; margin-bottom: 1rem;'>
@@ -740,12 +474,15 @@ def popup_editar_partido(partido):
                 st.rerun()
         with col2:
             if st.button("✓ Guardar", type="primary", use_container_width=True):
-                st.session_state.db.editar_partido(partido['id_partido'], fecha_nueva, hora_nueva)
+                resultado = st.session_state.db.editar_partido(
+                    partido['id_partido'], fecha_nueva, hora_nueva, version=partido.get('version'),
+                    vista=(partido['fecha'], partido['hora']))
                 st.session_state.partido_editar = None
                 st.session_state.modo_edicion = None
                 st.session_state.needs_match_refresh = True
-                st.success("¡Horario actualizado!")
-                time.sleep(1)
+                if aviso_cambio_partido(resultado):
+                    st.success("¡Horario actualizado!")
+                time.sleep(1 if resultado else 3)
                 st.rerun()
     
     # Vista de cancelar
@@ -764,18 +501,53 @@ def popup_editar_partido(partido):
                 st.rerun()
         with col2:
             if st.button("Sí, cancelar", type="primary", use_container_width=True):
-                st.session_state.db.cancelar_partido(partido['id_partido'])
+                resultado = st.session_state.db.cancelar_partido(
+                    partido['id_partido'], version=partido.get('version'), vista=(partido['fecha'], partido['hora']))
                 st.session_state.partido_editar = None
                 st.session_state.modo_edicion = None
                 st.session_state.needs_match_refresh = True
-                st.success("Partido cancelado")
-                time.sleep(1)
+                if aviso_cambio_partido(resultado):
+                    st.success("Partido cancelado")
+                time.sleep(1 if resultado else 3)
                 st.rerun()
 
+# --- ADMIN ---
+def es_admin():
+    """True si la URL lleva ?admin=<PADELITE_ADMIN_TOKEN>."""
+    token = os.environ.get("PADELITE_ADMIN_TOKEN", "")
+    return bool(token) and st.query_params.get("admin") == token
+
+def seccion(nombre):
+    """Etiqueta lo que se pinta a continuación para métricas y perfiles."""
+    metricas.pantalla(nombre)
+    perfilado.seccion(nombre)
+
+# Volcado de métricas: ?admin=<token>&metricas=json|prom|arranque|memoria
+if es_admin() and "metricas" in st.query_params:
+    if st.query_params["metricas"] == "arranque":
+        st.code(json.dumps({f: round(s * 1000, 1) for f, s in metricas.arranque.items()}, indent=2), language="json")
+    elif st.query_params["metricas"] == "memoria":
+        st.code(json.dumps(memoria.informe(), indent=2, ensure_ascii=False), language="json")
+    elif st.query_params["metricas"] == "prom":
+        st.code(metricas.registro.a_prometheus(), language="text")
+    else:
+        st.code(metricas.registro.a_json(), language="json")
+    st.stop()
+
 # --- INICIALIZACIÓN ---
+# Liga de la URL (?liga=<nombre>, ver ligas.py). Cambiar de liga en la misma
+# pestaña es empezar otra sesión: otra base de datos y otro usuario.
+liga = st.query_params.get("liga") or ligas.por_defecto()
+if liga not in ligas.configuradas():
+    st.error(f"Liga desconocida: {liga}")
+    st.stop()
+if 'db' in st.session_state and st.session_state.db.liga != liga:
+    for k in [k for k in st.session_state if k != 'sesion_id']:
+        del st.session_state[k]
+
 if 'db' not in st.session_state:
     try: 
-        st.session_state.db = PadelDB()
+        st.session_state.db = PadelDB(liga=liga)
     except Exception as e:
         st.error(f"Error de conexión: {e}")
         st.stop()
@@ -783,17 +555,47 @@ if 'db' not in st.session_state:
 if 'user' not in st.session_state: 
     st.session_state.user = None
 
-# Auto-login desde URL
+# Memoria por sesión (ver memoria.py): si la sesión se desalojó mientras estaba
+# inactiva se sueltan sus cachés y se reconstruyen en este rerun.
+CACHES_SESION = ('mis_slots_cache', 'disponibles_cache', 'programados_cache', 'historial_cache')
+if 'sesion_id' not in st.session_state:
+    st.session_state.sesion_id = uuid.uuid4().hex
+if memoria.tocar(st.session_state.sesion_id, st.session_state.db, (st.session_state.user or {}).get('id'),
+                 {k: st.session_state[k] for k in CACHES_SESION if k in st.session_state}):
+    for k in CACHES_SESION + ('partidos_cache',):
+        st.session_state.pop(k, None)
+
+if os.environ.get("PADELITE_ARCHIVO_DIARIO", "1") != "0":
+    ahora_madrid = datetime.now(pytz.timezone('Europe/Madrid'))
+    mantenimiento_diario(ahora_madrid.strftime('%Y-%m-%d'), liga, st.session_state.db)
+    materializacion_horaria(ahora_madrid.strftime('%Y-%m-%d %H'), liga, st.session_state.db)
+    jugados_por_cuarto(f"{ahora_madrid:%Y-%m-%d %H}:{ahora_madrid.minute // 15}", liga, st.session_state.db)
+
+# Auto-login desde URL: ?t=<token firmado> (ver sesiones.py). Un token válido
+# no cuesta ninguna llamada; uno caducado se renueva con el índice de usuarios.
 if st.session_state.user is None:
     params = st.query_params
     if "u" in params:
-        user_id_url = params["u"]
-        n, l = st.session_state.db.get_info_usuario(user_id_url)
-        if n:
-            st.session_state.user = {'id': user_id_url, 'nombre': n, 'nivel': l}
+        del st.query_params["u"]  # enlaces antiguos sin firmar: al login
+    if "t" in params:
+        usuario, renovar = sesiones.verificar(params["t"], liga)
+        resultado = 'token' if usuario else 'rechazado'
+        if renovar:
+            n, l = st.session_state.db.get_info_usuario(renovar)
+            if n:
+                usuario = {'id': renovar, 'nombre': n, 'nivel': l}
+                st.query_params["t"] = sesiones.emitir(renovar, n, l, liga)
+                resultado = 'renovado'
+        metricas.registro.incrementar('padelite_sesiones_total', resultado=resultado)
+        if usuario:
+            st.session_state.user = usuario
+            iniciar_prefetch(usuario['id'], usuario['nivel'])
+        else:
+            del st.query_params["t"]
 
 # --- VISTA: LOGIN ---
 def login():
+    seccion('login')
     st.markdown("<div style='height: 3rem;'></div>", unsafe_allow_html=True)
     
     # Logo / Título - Amarillo igual que botón y sliders
@@ -820,23 +622,40 @@ def login():
                     n, l = st.session_state.db.validar_login(u, p)
                 if n:
                     st.session_state.user = {'id': u, 'nombre': n, 'nivel': l}
-                    st.query_params["u"] = u 
+                    st.query_params["t"] = sesiones.emitir(u, n, l, liga)
+                    iniciar_prefetch(u, l)
                     st.rerun()
                 else: 
                     st.error("Credenciales incorrectas")
 
 # --- VISTA: MAIN APP ---
 def main_app():
-    # Cache de disponibilidad
+    # Partidos en segundo plano mientras se pinta el calendario
+    necesita_partidos = 'partidos_cache' not in st.session_state or st.session_state.get('needs_match_refresh', False)
+    if necesita_partidos:
+        iniciar_prefetch(st.session_state.user['id'], st.session_state.user['nivel'])
+    
+    # Cache de disponibilidad indexada por fecha: {fecha: (hora_inicio, hora_fin)}
     if 'mis_slots_cache' not in st.session_state:
         try:
-            st.session_state.mis_slots_cache = st.session_state.db.get_mis_horas(st.session_state.user['id'])
+            st.session_state.mis_slots_cache = {
+                r['fecha']: (r['hora_inicio'], r['hora_fin'])
+                for r in st.session_state.db.get_mis_horas(st.session_state.user['id'], nivel=st.session_state.user['nivel'])
+            }
         except:
             st.error("Error de conexión")
             return
+    
+    # Sin conexión con Sheets: se ve la copia local y no se puede guardar
+    if st.session_state.db.solo_lectura:
+        st.warning("⚠️ Sin conexión con Google Sheets: ves los últimos datos guardados y no se pueden guardar cambios.")
+        if st.button("Reintentar conexión", key="reintentar_conexion", use_container_width=True):
+            del st.session_state.db
+            st.rerun()
 
     mis_slots_guardados = st.session_state.mis_slots_cache
-    nuevos_registros = []
+    editados = {}
+    fechas_editables = set()
     
     # === HEADER (sin botón de salir) ===
     nombre_completo = st.session_state.user['nombre']
@@ -848,6 +667,7 @@ def main_app():
     """, unsafe_allow_html=True)
     
     # === CALENDARIO ===
+    seccion('calendario')
     zona_madrid = pytz.timezone('Europe/Madrid')
     hoy = datetime.now(zona_madrid)
     lunes_esta_semana = hoy - timedelta(days=hoy.weekday())
@@ -900,42 +720,36 @@ def main_app():
                 dia_nombre = dias_es[fecha.strftime('%a')]
                 dia_num = fecha.day
                 
-                registro_hoy = next((r for r in mis_slots_guardados if r['fecha'] == fecha_str), None)
+                registro_hoy = mis_slots_guardados.get(fecha_str)
                 activo_por_defecto = registro_hoy is not None
                 
                 with st.container(border=True):
                     if es_pasado:
                         st.markdown(f"<span style='color: var(--text-muted);'>{dia_nombre} {dia_num}</span>", unsafe_allow_html=True)
                     else:
+                        fechas_editables.add(fecha_str)
                         col1, col2 = st.columns([1.2, 2])
                         with col1:
                             activo = st.toggle(f"{dia_nombre} {dia_num}", value=activo_por_defecto, key=f"t_{i}")
                         
                         if activo:
                             with col2:
-                                val = (registro_hoy['hora_inicio'], registro_hoy['hora_fin']) if registro_hoy else ("17:00", "21:00")
+                                val = tuple(registro_hoy) if registro_hoy else ("17:00", "21:00")
                                 rango = st.select_slider("Horario", options=OPCIONES_HORAS, value=val, key=f"s_{i}", label_visibility="collapsed")
-                                nuevos_registros.append(crear_registro_disponibilidad(fecha_str, rango[0], rango[1]))
+                                editados[fecha_str] = (rango[0], rango[1])
     
-    st.markdown("<div style='height: 1rem;'></div>", unsafe_allow_html=True)
+    # Solo los días añadidos, quitados o modificados respecto a lo guardado
+    cambios = calcular_cambios(mis_slots_guardados, editados, fechas_editables)
     
-    # === BOTÓN GUARDAR AMARILLO ===
-    st.markdown("""
-        <style>
-        /* Botón guardar disponibilidad amarillo */
-        div[data-testid="stButton"] > button[kind="primary"] {
-            background-color: #D4D700 !important;
-            color: #1a1a1a !important;
-            border: none !important;
-        }
-        div[data-testid="stButton"] > button[kind="primary"]:hover {
-            background-color: #b8ba00 !important;
-        }
-        </style>
-    """, unsafe_allow_html=True)
+    st.markdown("<div style='height: 1rem;'></div>", unsafe_allow_html=True)
     
-    if st.button("Guardar disponibilidad", type="primary", use_container_width=True):
-        st.session_state.mostrar_popup_guardado = True
+    # === BOTÓN GUARDAR AMARILLO (estilo en static/theme.css) ===
+    if st.button("Guardar disponibilidad", type="primary", use_container_width=True,
+                 disabled=st.session_state.db.solo_lectura):
+        if hay_cambios(cambios):
+            st.session_state.mostrar_popup_guardado = True
+        else:
+            st.toast("No hay cambios que guardar")
 
     if st.session_state.get('mostrar_popup_guardado', False):
         popup_guardando(
@@ -943,92 +757,62 @@ def main_app():
             st.session_state.user['id'], 
             st.session_state.user['nombre'], 
             st.session_state.user.get('nivel', ''),
-            nuevos_registros
+            cambios
         )
     
     st.markdown("<div class='divider'></div>", unsafe_allow_html=True)
     
     # === PARTIDOS ===
-    if 'partidos_cache' not in st.session_state or st.session_state.get('needs_match_refresh', False):
+    seccion('partidos')
+    if necesita_partidos:
+        # El calendario ya está enviado; aquí solo se espera al prefetch
         with st.spinner("Cargando partidos..."):
             try:
-                user_id = st.session_state.user['id']
-                st.session_state.disponibles_cache = st.session_state.db.get_partidos_disponibles(user_id)
-                partidos_data = st.session_state.db.get_partidos_usuario(user_id)
-                st.session_state.programados_cache = partidos_data.get('programados', [])
-                st.session_state.jugados_cache = partidos_data.get('jugados', [])
+                partidos_data = st.session_state.prefetch_partidos.result()
+                st.session_state.disponibles_cache = partidos_data['disponibles']
+                st.session_state.programados_cache = partidos_data['programados']
+                # El historial se vuelve a paginar bajo demanda
+                st.session_state.pop('historial_cache', None)
                 st.session_state.partidos_cache = True
                 st.session_state.needs_match_refresh = False
+                st.session_state.pop('fechas_refresco', None)
             except: 
                 pass
+            finally:
+                st.session_state.prefetch_partidos = None
+    elif st.session_state.get('fechas_refresco'):
+        # Tras guardar disponibilidad solo cambian las coincidencias de esas fechas
+        fechas = st.session_state.fechas_refresco
+        try:
+            parciales = st.session_state.db.get_partidos_disponibles(
+                st.session_state.user['id'], fechas=fechas, nivel=st.session_state.user['nivel']
+            )
+            st.session_state.disponibles_cache = fusionar_disponibles(
+                st.session_state.get('disponibles_cache', []), parciales, fechas
+            )
+            st.session_state.pop('fechas_refresco', None)
+        except:
+            pass
         
     matches = st.session_state.get('disponibles_cache', [])
-    programados = st.session_state.get('programados_cache', [])
-    jugados = st.session_state.get('jugados_cache', [])
+    # Los ya terminados salen de "Próximos partidos" aunque aún no se hayan marcado como JUGADO
+    ahora = datetime.now(pytz.timezone('Europe/Madrid')).replace(tzinfo=None)
+    programados = [p for p in st.session_state.get('programados_cache', [])
+                   if not partido_terminado(p.get('fecha', ''), p.get('hora', ''), ahora)]
     
     # Partidos Disponibles - Cards con degradado azul
     if matches:
         st.markdown("<h3>Partidos disponibles</h3>", unsafe_allow_html=True)
         st.markdown("<p style='color: #64748b; font-size: 0.8rem; margin-bottom: 1rem;'>Partidos donde coincides en disponibilidad con tus compañeros</p>", unsafe_allow_html=True)
         
-        for m in matches:
-            # Separar jugadores en 4 líneas
-            nombres_str = m.get('nombres_str', '')
-            try:
-                eq1, eq2 = nombres_str.split(" vs ")
-                j1, j2 = eq1.split("/")
-                j3, j4 = eq2.split("/")
-            except:
-                j1, j2, j3, j4 = nombres_str, "", "", ""
-            
-            # Obtener resumen de coincidencias
-            coincidencias = m.get('coincidencias', [])
-            primera = coincidencias[0] if coincidencias else {}
-            num_dias = len(coincidencias)
-            
-            # Formatear primera fecha
-            fecha_display = primera.get('fecha', '')
-            if num_dias > 1:
-                fecha_display = f"{num_dias} días disponibles"
-            else:
-                fecha_display = f"{fecha_display} · {primera.get('hora_inicio', '')} - {primera.get('hora_fin', '')}"
-            
-            # Card con info del partido - jugadores en 4 líneas
-            card_html = f"""
-                <div style='background: linear-gradient(135deg, #e3f2fd 0%, #fff 100%); padding: 0.75rem; border-radius: 10px; margin-bottom: 0.5rem; border-left: 3px solid #1E88E5;'>
-                    <div style='display: flex; justify-content: space-between; align-items: center; margin-bottom: 0.5rem;'>
-                        <span style='font-weight: 600; font-size: 0.85rem;'>{m['titulo']}</span>
-                        <span style='background: #1E88E5; color: white; padding: 2px 8px; border-radius: 6px; font-size: 0.65rem; font-weight: 700;'>DISPONIBLE</span>
-                    </div>
-                    <p style='font-size: 0.75rem; color: #64748b; margin: 0 0 0.5rem;'>{fecha_display}</p>
-                    <div style='font-size: 0.85rem; margin-bottom: 0.75rem; text-align: center;'>
-                        <p style='margin: 0;'>{j1}</p>
-                        <p style='margin: 0;'>{j2}</p>
-                        <p style='margin: 0.25rem 0; font-size: 0.7rem; color: #64748b; font-weight: 600;'>vs</p>
-                        <p style='margin: 0;'>{j3}</p>
-                        <p style='margin: 0;'>{j4}</p>
-                    </div>
-                </div>
-            """
-            st.markdown(card_html, unsafe_allow_html=True)
-            
-            # Botón que abre el popup - con CSS para forzar azul
-            st.markdown("""
-                <style>
-                div[data-testid="stButton"] > button[kind="primary"] {
-                    background-color: #1E88E5 !important;
-                    color: white !important;
-                    border: none !important;
-                }
-                div[data-testid="stButton"] > button[kind="primary"]:hover {
-                    background-color: #1565C0 !important;
-                }
-                </style>
-            """, unsafe_allow_html=True)
-            
-            if st.button("Confirmar partido", key=f"btn_confirmar_{m['id_partido']}", type="primary", use_container_width=True):
-                st.session_state.partido_confirmar = m
-                st.rerun()
+        # Todas las tarjetas en un único bloque + CSS del botón azul una sola vez
+        st.markdown(tarjetas.seccion_html('disponible', matches) + CSS_BOTON_AZUL, unsafe_allow_html=True)
+        
+        seleccionado = selector_partido(matches, "sel_confirmar")
+        if st.button("Confirmar partido", key=f"btn_confirmar_{seleccionado['id_partido']}", type="primary",
+                     use_container_width=True, disabled=st.session_state.db.solo_lectura):
+            st.session_state.partido_confirmar = seleccionado
+            st.rerun()
     
     # Mostrar popup si hay partido a confirmar
     if st.session_state.get('partido_confirmar'):
@@ -1038,60 +822,22 @@ def main_app():
     if programados:
         st.markdown("<h3 style='margin-top: 1.5rem;'>Próximos partidos</h3>", unsafe_allow_html=True)
         
-        for p in programados:
-            titulo = p.get('titulo', p.get('id_partido', ''))
-            nombres_str = p.get('nombres_str', "")
-            
-            # Separar jugadores en 4 líneas
-            try:
-                eq1, eq2 = nombres_str.split(" vs ")
-                j1, j2 = eq1.split("/")
-                j3, j4 = eq2.split("/")
-            except:
-                j1, j2, j3, j4 = nombres_str, "", "", ""
-            
-            card_html = f"""
-                <div style='background: linear-gradient(135deg, #f7f8cc 0%, #fff 100%); padding: 0.75rem; border-radius: 10px; margin-bottom: 0.5rem; border-left: 3px solid #D4D700;'>
-                    <div style='display: flex; justify-content: space-between; align-items: center; margin-bottom: 0.5rem;'>
-                        <span style='font-weight: 600; font-size: 0.85rem;'>{titulo}</span>
-                        <span style='background: #D4D700; color: #1a1a1a; padding: 2px 8px; border-radius: 6px; font-size: 0.65rem; font-weight: 700;'>PROGRAMADO</span>
-                    </div>
-                    <p style='font-size: 0.75rem; color: #64748b; margin: 0 0 0.5rem;'>{p.get('fecha', '')} · {p.get('hora', '')}</p>
-                    <div style='font-size: 0.85rem; text-align: center;'>
-                        <p style='margin: 0;'>{j1}</p>
-                        <p style='margin: 0;'>{j2}</p>
-                        <p style='margin: 0.25rem 0; font-size: 0.7rem; color: #64748b; font-weight: 600;'>vs</p>
-                        <p style='margin: 0;'>{j3}</p>
-                        <p style='margin: 0;'>{j4}</p>
-                    </div>
-                </div>
-            """
-            st.markdown(card_html, unsafe_allow_html=True)
-            
-            # Botón Editar AZUL (igual que Confirmar partido)
-            st.markdown("""
-                <style>
-                div[data-testid="stButton"] > button[kind="primary"] {
-                    background-color: #1E88E5 !important;
-                    color: white !important;
-                    border: none !important;
-                }
-                div[data-testid="stButton"] > button[kind="primary"]:hover {
-                    background-color: #1565C0 !important;
-                }
-                </style>
-            """, unsafe_allow_html=True)
-            
-            if st.button("Editar", key=f"btn_editar_{p['id_partido']}", type="primary", use_container_width=True):
-                st.session_state.partido_editar = p
-                st.session_state.modo_edicion = None
-                st.rerun()
+        # Botón Editar AZUL (igual que Confirmar partido)
+        st.markdown(tarjetas.seccion_html('programado', programados) + CSS_BOTON_AZUL, unsafe_allow_html=True)
+        
+        seleccionado = selector_partido(programados, "sel_editar")
+        if st.button("Editar", key=f"btn_editar_{seleccionado['id_partido']}", type="primary",
+                     use_container_width=True, disabled=st.session_state.db.solo_lectura):
+            st.session_state.partido_editar = seleccionado
+            st.session_state.modo_edicion = None
+            st.rerun()
     
     # Mostrar popup de editar si hay partido a editar
     if st.session_state.get('partido_editar'):
         popup_editar_partido(st.session_state.partido_editar)
     
     # Historial de Partidos Jugados - Con botón para expandir
+    seccion('historial')
     st.markdown("<h3 style='margin-top: 1.5rem;'>Historial de partidos</h3>", unsafe_allow_html=True)
     
     if 'mostrar_historial' not in st.session_state:
@@ -1120,41 +866,37 @@ def main_app():
         st.rerun()
     
     if st.session_state.mostrar_historial:
+        # Primera página al desplegar; las siguientes solo bajo demanda
+        if 'historial_cache' not in st.session_state:
+            pagina = st.session_state.db.get_historial_usuario(
+                st.session_state.user['id'], limite=HISTORIAL_POR_PAGINA, nivel=st.session_state.user['nivel']
+            )
+            st.session_state.historial_cache = {'partidos': pagina['partidos'], 'total': pagina['total']}
+        
+        historial = st.session_state.historial_cache
+        jugados = historial['partidos']
         if jugados:
-            for p in jugados:
-                titulo = p.get('titulo', p.get('id_partido', ''))
-                nombres_str = p.get('nombres_str', "")
-                
-                # Separar jugadores en 4 líneas
-                try:
-                    eq1, eq2 = nombres_str.split(" vs ")
-                    j1, j2 = eq1.split("/")
-                    j3, j4 = eq2.split("/")
-                except:
-                    j1, j2, j3, j4 = nombres_str, "", "", ""
-                
-                card_html = f"""
-                    <div style='background: linear-gradient(135deg, #e2e8ed 0%, #fff 100%); padding: 0.75rem; border-radius: 10px; margin-bottom: 0.5rem; border-left: 3px solid #94a3b8;'>
-                        <div style='display: flex; justify-content: space-between; align-items: center; margin-bottom: 0.5rem;'>
-                            <span style='font-weight: 600; font-size: 0.85rem;'>{titulo}</span>
-                            <span style='background: #94a3b8; color: white; padding: 2px 8px; border-radius: 6px; font-size: 0.65rem; font-weight: 700;'>JUGADO</span>
-                        </div>
-                        <p style='font-size: 0.7rem; color: #64748b; margin: 0 0 0.5rem;'>{p.get('fecha', '')}</p>
-                        <div style='font-size: 0.8rem; text-align: center;'>
-                            <p style='margin: 0;'>{j1}</p>
-                            <p style='margin: 0;'>{j2}</p>
-                            <p style='margin: 0.1rem 0; font-size: 0.65rem; color: #94a3b8; font-weight: 600;'>vs</p>
-                            <p style='margin: 0;'>{j3}</p>
-                            <p style='margin: 0;'>{j4}</p>
-                        </div>
-                    </div>
-                """
-                st.markdown(card_html, unsafe_allow_html=True)
+            st.markdown(tarjetas.seccion_html('jugado', jugados), unsafe_allow_html=True)
+            
+            if len(jugados) < historial['total']:
+                if st.button(f"Ver más ({len(jugados)} de {historial['total']})", key="historial_mas", use_container_width=True):
+                    pagina = st.session_state.db.get_historial_usuario(
+                        st.session_state.user['id'], limite=HISTORIAL_POR_PAGINA, offset=len(jugados),
+                        nivel=st.session_state.user['nivel']
+                    )
+                    historial['partidos'] = jugados + pagina['partidos']
+                    historial['total'] = pagina['total']
+                    st.rerun()
         else:
             st.markdown("<p style='color: #64748b; font-size: 0.85rem; text-align: center;'>No hay partidos jugados aún</p>", unsafe_allow_html=True)
 
 # === ROUTER ===
-if st.session_state.user is None:
-    login()
-else:
-    main_app()
\ No newline at end of file
+# Perfil del rerun: PADELITE_PERFIL=1 o ?admin=<token>&perfil=1 (ver perfilado.py)
+perfilar = perfilado.activado_por_entorno() or (es_admin() and st.query_params.get("perfil") == "1")
+with perfilado.perfilar_rerun('login' if st.session_state.user is None else 'main', perfilar):
+    if st.session_state.user is None:
+        login()
+        metricas.marcar_arranque('hasta_login')
+    else:
+        main_app()
+        metricas.marcar_arranque('hasta_main')
\ No newline at end of file
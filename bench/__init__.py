@@ -0,0 +1,3 @@
+"""
+PadelLite Bench - Benchmarks y pruebas de carga con Google Sheets en memoria.
+"""
@@ -0,0 +1,181 @@
+"""
+PadelLite Bench - Benchmarks de PadelDB a escala de liga
+========================================================
+Uso:
+    python -m bench.bench_backend --grupos 1,6,13,26 --repeticiones 5
+    python -m bench.bench_backend --latencia 0.05 --json resultados.json
+    python -m bench.bench_backend --comparar base.json   # falla si hay regresión
+    python -m bench.bench_backend --particionado         # hojas por nivel
+    python -m bench.bench_backend --eventos              # disponibilidad como eventos
+
+Para cada tamaño de liga mide tiempo de pared y nº de llamadas a la API de
+Sheets de login, get_partidos_usuario, get_partidos_disponibles y guardado de
+disponibilidad, en frío (caché vacía) y en caliente. Con --particionado el
+libro se migra antes con particionar_hojas (una hoja por nivel) y con
+--eventos los guardados van al registro de eventos (activar_eventos_disponibilidad).
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+import metricas
+from backend import PadelDB
+from bench.liga import libro_liga, id_jugador, NIVELES, PASSWORD
+
+
+def llamadas_api():
+    return metricas.registro.total('padelite_sheets_llamadas_total')
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+# =============================================================================
+# CASOS
+# =============================================================================
+
+def _slot_alterno(rep):
+    """Delta de guardado que alterna entre añadir y quitar un día."""
+    fecha = (date.today() + timedelta(days=27)).isoformat()
+    if rep % 2 == 0:
+        return {'altas': {fecha: ('19:00', '22:00')}, 'cambios': {}, 'bajas': []}
+    return {'altas': {}, 'cambios': {}, 'bajas': [fecha]}
+
+
+def _slots_completos():
+    """Disponibilidad completa de 14 días (lo que enviaba el guardado original)."""
+    return [
+        {'fecha': (date.today() + timedelta(days=d)).isoformat(), 'hora_inicio': '18:00', 'hora_fin': '21:00'}
+        for d in range(0, 28, 2)
+    ]
+
+
+CASOS = [
+    # (nombre, escritura, función(db, uid, nivel, rep))
+    ('login', False, lambda db, uid, nivel, rep: db.validar_login(uid, PASSWORD)),
+    ('get_partidos_usuario', False, lambda db, uid, nivel, rep: db.get_partidos_usuario(uid, nivel=nivel)),
+    ('get_partidos_disponibles', False, lambda db, uid, nivel, rep: db.get_partidos_disponibles(uid, nivel=nivel)),
+    ('guardar_disponibilidad', True,
+     lambda db, uid, nivel, rep: db.guardar_disponibilidad(uid, nivel, _slots_completos())),
+    ('guardar_cambios_disponibilidad', True,
+     lambda db, uid, nivel, rep: db.guardar_cambios_disponibilidad(uid, nivel, _slot_alterno(rep))),
+]
+
+
+def medir_caso(db, funcion, uid, nivel, repeticiones, frio):
+    """Ejecuta un caso y devuelve (tiempos en s, llamadas API por operación)."""
+    tiempos = []
+    llamadas = 0
+    if not frio:
+        funcion(db, uid, nivel, -1)
+    for rep in range(repeticiones):
+        if frio:
+            db._invalidate_cache()
+        antes = llamadas_api()
+        inicio = time.perf_counter()
+        funcion(db, uid, nivel, rep)
+        tiempos.append(time.perf_counter() - inicio)
+        llamadas += llamadas_api() - antes
+    return tiempos, llamadas / repeticiones
+
+
+def ejecutar(grupos, repeticiones=5, latencia=0.0, prob_error_cuota=0.0, particionado=False, eventos=False):
+    resultados = []
+    for n in grupos:
+        libro = libro_liga(n, prob_error_cuota=prob_error_cuota)
+        filas = {h: libro.hoja(h).row_count - 1 for h in ('USUARIOS', 'DISPONIBILIDAD', 'PARTIDOS')}
+        if particionado:
+            PadelDB(sheet=libro).particionar_hojas()
+        if eventos:
+            PadelDB(sheet=libro).activar_eventos_disponibilidad()
+        libro.latencia = latencia
+        db = PadelDB(sheet=libro)
+        # Jugador del último grupo (el peor caso si las hojas se recorren en orden)
+        uid, nivel = id_jugador(n - 1, 0), NIVELES[(n - 1) % len(NIVELES)]
+
+        for nombre, escritura, funcion in CASOS:
+            for frio in ((True,) if escritura else (True, False)):
+                tiempos, llamadas = medir_caso(db, funcion, uid, nivel, repeticiones, frio)
+                resultados.append({
+                    'grupos': n,
+                    'particionado': particionado,
+                    'eventos': eventos,
+                    'filas': filas,
+                    'caso': nombre,
+                    'modo': 'frio' if frio else 'caliente',
+                    'mediana_ms': statistics.median(tiempos) * 1000,
+                    'p95_ms': _percentil(tiempos, 95) * 1000,
+                    'llamadas_api': llamadas,
+                })
+    return resultados
+
+
+# =============================================================================
+# INFORME
+# =============================================================================
+
+def imprimir(resultados):
+    print(f"{'grupos':>6}  {'caso':<32} {'modo':<9} {'mediana ms':>11} {'p95 ms':>9} {'API/op':>7}")
+    for r in resultados:
+        print(f"{r['grupos']:>6}  {r['caso']:<32} {r['modo']:<9} "
+              f"{r['mediana_ms']:>11.2f} {r['p95_ms']:>9.2f} {r['llamadas_api']:>7.1f}")
+
+
+def comparar(resultados, base, tolerancia):
+    """Lista de regresiones (tiempo por encima de la tolerancia o más llamadas API)."""
+    def clave(r):
+        return (r['grupos'], r.get('particionado', False), r.get('eventos', False), r['caso'], r['modo'])
+
+    indice = {clave(b): b for b in base}
+    regresiones = []
+    for r in resultados:
+        b = indice.get(clave(r))
+        if not b:
+            continue
+        if r['llamadas_api'] > b['llamadas_api']:
+            regresiones.append(f"{r['caso']} ({r['modo']}, {r['grupos']} grupos): "
+                               f"API/op {b['llamadas_api']:.1f} -> {r['llamadas_api']:.1f}")
+        if r['mediana_ms'] > b['mediana_ms'] * (1 + tolerancia) and r['mediana_ms'] - b['mediana_ms'] > 1:
+            regresiones.append(f"{r['caso']} ({r['modo']}, {r['grupos']} grupos): "
+                               f"{b['mediana_ms']:.2f} ms -> {r['mediana_ms']:.2f} ms")
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de PadelDB con hojas en memoria")
+    parser.add_argument('--grupos', default='1,6,13,26', help="tamaños de liga separados por comas (1-26)")
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--latencia', type=float, default=0.0, help="segundos por llamada a la API")
+    parser.add_argument('--prob-error-cuota', type=float, default=0.0)
+    parser.add_argument('--particionado', action='store_true', help="migrar antes a una hoja por nivel")
+    parser.add_argument('--eventos', action='store_true', help="guardar la disponibilidad como eventos")
+    parser.add_argument('--json', help="guardar resultados en este fichero")
+    parser.add_argument('--comparar', help="resultados base (JSON) contra los que detectar regresiones")
+    parser.add_argument('--tolerancia', type=float, default=0.25, help="margen de tiempo admitido (0.25 = +25%%)")
+    args = parser.parse_args(argv)
+
+    grupos = [int(g) for g in args.grupos.split(',')]
+    resultados = ejecutar(grupos, args.repeticiones, args.latencia, args.prob_error_cuota,
+                          args.particionado, args.eventos)
+    imprimir(resultados)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(resultados, f, indent=2)
+
+    if args.comparar:
+        with open(args.comparar) as f:
+            regresiones = comparar(resultados, json.load(f), args.tolerancia)
+        for r in regresiones:
+            print(f"REGRESIÓN: {r}")
+        return 1 if regresiones else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,262 @@
+"""
+PadelLite Bench - Prueba de carga de app.py con sesiones concurrentes
+=====================================================================
+Uso:
+    python -m bench.carga --sesiones 1,5,10,20 --grupos 6
+    python -m bench.carga --sesiones 10 --latencia 0.08 --json carga.json
+
+Cada sesión simulada es un AppTest (streamlit.testing) contra el mismo
+Sheets en memoria y hace: login, activar un día, guardar disponibilidad y
+confirmar un partido si tiene alguno disponible. Se informa de la latencia de
+rerun (p50/p95/p99), llamadas al backend por sesión y RSS del proceso.
+
+Nota: los reruns de guardar/confirmar incluyen las pausas que hace la propia
+app (time.sleep de 0.5 s y 1 s); el desglose por paso las deja a la vista.
+"""
+import argparse
+import contextlib
+import json
+import os
+import resource
+import statistics
+import sys
+import threading
+import time
+from datetime import datetime
+
+import pytz
+
+from backend import PadelDB
+from bench.liga import libro_liga, id_jugador, PASSWORD
+
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+# =============================================================================
+# APPTEST EN PARALELO
+# =============================================================================
+
+def preparar_apptest():
+    """
+    AppTest no está pensado para varias instancias en hilos a la vez: cada run
+    reinstala un Runtime simulado global, parchea la config global y recompila
+    el script. Se fijan un Runtime y un ScriptCache compartidos para que las
+    sesiones puedan ejecutarse de verdad en paralelo, como en el servidor.
+    """
+    from unittest.mock import MagicMock
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    import streamlit.testing.v1.app_test as app_test
+    import streamlit.testing.v1.local_script_runner as local_script_runner
+
+    config.set_option('global.appTest', True)
+    app_test.patch_config_options = lambda *args, **kwargs: contextlib.nullcontext()
+
+    cache_script = ScriptCache()
+    app_test.ScriptCache = lambda: cache_script
+    local_script_runner.ScriptCache = lambda: cache_script
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime._instance = runtime
+
+    class _MetaRuntimeFijo(type):
+        # Ignora 'Runtime._instance = ...' de cada run; el resto va al Runtime real
+        def __setattr__(cls, nombre, valor):
+            if nombre != '_instance':
+                setattr(Runtime, nombre, valor)
+
+        def __getattr__(cls, nombre):
+            return getattr(Runtime, nombre)
+
+    class RuntimeFijo(metaclass=_MetaRuntimeFijo):
+        pass
+
+    app_test.Runtime = RuntimeFijo
+
+
+class LibroContado:
+    """Envuelve el libro compartido para contar las llamadas de una sola sesión."""
+
+    def __init__(self, libro):
+        self._libro = libro
+        self.llamadas = 0
+
+    def _contar(self, valor):
+        if not callable(valor):
+            return valor
+
+        def llamada(*args, **kwargs):
+            self.llamadas += 1
+            return valor(*args, **kwargs)
+        return llamada
+
+    def worksheet(self, nombre):
+        self.llamadas += 1
+        return _HojaContada(self._libro.worksheet(nombre), self)
+
+    def __getattr__(self, attr):
+        return self._contar(getattr(self._libro, attr))
+
+
+class _HojaContada:
+    def __init__(self, ws, libro):
+        self._ws = ws
+        self._libro_contado = libro
+
+    def __getattr__(self, attr):
+        return self._libro_contado._contar(getattr(self._ws, attr))
+
+
+# =============================================================================
+# SESIÓN SIMULADA
+# =============================================================================
+
+def _indice_manana():
+    """Índice del toggle de mañana en el calendario (t_<i>, 0 = lunes de esta semana)."""
+    hoy = datetime.now(pytz.timezone('Europe/Madrid'))
+    return hoy.weekday() + 1
+
+
+def _boton(at, etiqueta):
+    return next((b for b in at.button if b.label == etiqueta), None)
+
+
+def sesion(libro, user_id, resultados):
+    """Recorre el flujo de un jugador y añade sus tiempos a 'resultados'."""
+    from streamlit.testing.v1 import AppTest
+
+    tiempos = []
+    contado = LibroContado(libro)
+    error = None
+
+    def paso(nombre, accion):
+        inicio = time.perf_counter()
+        at_ = accion()
+        tiempos.append((nombre, time.perf_counter() - inicio))
+        if at_.exception:
+            raise RuntimeError(f"{nombre}: {at_.exception[0].message}")
+        return at_
+
+    try:
+        at = AppTest.from_file(APP, default_timeout=120)
+        at.session_state['db'] = PadelDB(sheet=contado)
+        paso('inicio', at.run)
+
+        at.text_input[0].input(user_id)
+        at.text_input[1].input(PASSWORD)
+        paso('login', at.button[0].click().run)
+
+        i = _indice_manana()
+        activo = at.toggle(key=f"t_{i}").value
+        paso('toggle', at.toggle(key=f"t_{i}").set_value(not activo).run)
+
+        paso('guardar', at.button[0].click().run)
+        continuar = _boton(at, "Continuar")
+        if continuar:
+            paso('guardar_continuar', continuar.click().run)
+
+        confirmar = _boton(at, "Confirmar partido")
+        if confirmar:
+            paso('abrir_confirmar', confirmar.click().run)
+            ok = _boton(at, "✓ Confirmar")
+            if ok:
+                paso('confirmar', ok.click().run)
+    except Exception as e:
+        error = str(e)
+
+    resultados.append({'usuario': user_id, 'tiempos': tiempos,
+                       'llamadas_backend': contado.llamadas, 'error': error})
+
+
+# =============================================================================
+# EJECUCIÓN
+# =============================================================================
+
+def rss_mb():
+    """RSS actual del proceso en MB (pico si no hay /proc)."""
+    try:
+        with open('/proc/self/status') as f:
+            for linea in f:
+                if linea.startswith('VmRSS:'):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def ejecutar_nivel(n_sesiones, grupos, latencia):
+    libro = libro_liga(grupos, latencia=latencia)
+    usuarios = [id_jugador(k % grupos, (k // grupos) % 9) for k in range(n_sesiones)]
+    resultados = []
+    hilos = [threading.Thread(target=sesion, args=(libro, uid, resultados)) for uid in usuarios]
+
+    inicio = time.perf_counter()
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    duracion = time.perf_counter() - inicio
+
+    tiempos = [t for r in resultados for _, t in r['tiempos']]
+    por_paso = {}
+    for r in resultados:
+        for nombre, t in r['tiempos']:
+            por_paso.setdefault(nombre, []).append(t)
+
+    return {
+        'sesiones': n_sesiones,
+        'errores': [r['error'] for r in resultados if r['error']],
+        'duracion_s': duracion,
+        'p50_ms': _percentil(tiempos, 50) * 1000,
+        'p95_ms': _percentil(tiempos, 95) * 1000,
+        'p99_ms': _percentil(tiempos, 99) * 1000,
+        'por_paso_p95_ms': {k: _percentil(v, 95) * 1000 for k, v in por_paso.items()},
+        'llamadas_por_sesion': statistics.mean(r['llamadas_backend'] for r in resultados) if resultados else 0,
+        'rss_mb': rss_mb(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga de app.py con sesiones AppTest concurrentes")
+    parser.add_argument('--sesiones', default='1,5,10,20', help="nº de sesiones concurrentes (lista)")
+    parser.add_argument('--grupos', type=int, default=6, help="tamaño de la liga sintética")
+    parser.add_argument('--latencia', type=float, default=0.0, help="segundos por llamada a la API")
+    parser.add_argument('--json', help="guardar resultados en este fichero")
+    args = parser.parse_args(argv)
+
+    preparar_apptest()
+    informe = []
+    print(f"{'N':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'API/sesión':>11} {'RSS MB':>8} {'errores':>8}")
+    for n in [int(x) for x in args.sesiones.split(',')]:
+        r = ejecutar_nivel(n, args.grupos, args.latencia)
+        informe.append(r)
+        print(f"{n:>4} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f} "
+              f"{r['llamadas_por_sesion']:>11.1f} {r['rss_mb']:>8.1f} {len(r['errores']):>8}")
+        for nombre, p95 in sorted(r['por_paso_p95_ms'].items()):
+            print(f"       {nombre:<18} p95 {p95:>9.1f} ms")
+        for e in r['errores'][:3]:
+            print(f"       error: {e}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(informe, f, indent=2)
+    return 1 if any(r['errores'] for r in informe) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,294 @@
+"""
+PadelLite Bench - Google Sheets en memoria
+==========================================
+Imita la parte de gspread que usa backend.py (Spreadsheet.worksheet y los
+métodos de Worksheet) para poder ejecutar PadelDB sin credenciales.
+Opcionalmente añade latencia por llamada y errores de cuota aleatorios.
+"""
+import random
+import re
+import threading
+import time
+from functools import wraps
+
+from gspread.exceptions import WorksheetNotFound
+
+
+class ErrorCuota(Exception):
+    """Equivalente al 429 'Quota exceeded' de la API de Sheets."""
+
+
+def _numerizar(valor):
+    """Convierte como gspread.get_all_records: enteros y decimales a número."""
+    if valor == '':
+        return valor
+    try:
+        return int(valor)
+    except ValueError:
+        pass
+    try:
+        return float(valor)
+    except ValueError:
+        return valor
+
+
+def _celda_a1(ref):
+    """'C12' -> (12, 3). Una referencia solo de columna ('C') devuelve fila None."""
+    m = re.match(r"^([A-Z]+)(\d*)$", ref.upper())
+    if not m:
+        raise ValueError(f"Referencia A1 no válida: {ref}")
+    col = 0
+    for letra in m.group(1):
+        col = col * 26 + ord(letra) - 64
+    return (int(m.group(2)) if m.group(2) else None), col
+
+
+def _rango_a1(rango):
+    """'HOJA!A2:E3' -> (nombre_hoja o None, fila_ini, col_ini)."""
+    hoja = None
+    if '!' in rango:
+        hoja, rango = rango.rsplit('!', 1)
+        hoja = hoja.strip("'")
+    inicio = rango.split(':')[0]
+    fila, col = _celda_a1(inicio)
+    return hoja, fila or 1, col
+
+
+def _valor_introducido(valor):
+    """Texto de una celda de batch_update ({'stringValue': ...}, {'boolValue': ...}...), como lo enseña Sheets."""
+    if not valor:
+        return ''
+    v = next(iter(valor.values()))
+    return ('TRUE' if v else 'FALSE') if isinstance(v, bool) else v
+
+
+def _atomica(func):
+    """Ejecuta la operación con el cerrojo de datos del libro (tras simular la API)."""
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        self._llamada()
+        with self._libro._datos:
+            return func(self, *args, **kwargs)
+    return wrapper
+
+
+# =============================================================================
+# HOJA
+# =============================================================================
+
+class HojaFalsa:
+    """Worksheet en memoria. Las celdas se guardan como texto, igual que Sheets."""
+
+    def __init__(self, libro, title, filas=None):
+        self._libro = libro
+        self.title = title
+        self.id = libro._siguiente_id
+        libro._siguiente_id += 1
+        self._filas = [[str(v) for v in fila] for fila in (filas or [])]
+
+    # -- utilidades internas --------------------------------------------------
+
+    def _llamada(self):
+        self._libro._simular_api()
+
+    def _recortar(self):
+        while self._filas and not any(v != '' for v in self._filas[-1]):
+            self._filas.pop()
+
+    def _escribir(self, fila, col, valores):
+        for i, valores_fila in enumerate(valores):
+            n = fila - 1 + i
+            while len(self._filas) <= n:
+                self._filas.append([])
+            destino = self._filas[n]
+            for j, v in enumerate(valores_fila):
+                c = col - 1 + j
+                while len(destino) <= c:
+                    destino.append('')
+                destino[c] = '' if v is None else str(v)
+        self._recortar()
+
+    @property
+    def row_count(self):
+        return len(self._filas)
+
+    @property
+    def col_count(self):
+        return max((len(f) for f in self._filas), default=0)
+
+    # -- lectura ----------------------------------------------------------------
+
+    @_atomica
+    def get_all_values(self):
+        ancho = max((len(f) for f in self._filas), default=0)
+        return [list(f) + [''] * (ancho - len(f)) for f in self._filas]
+
+    @_atomica
+    def get_all_records(self):
+        if not self._filas:
+            return []
+        headers = self._filas[0]
+        return [
+            {h: _numerizar(fila[i] if i < len(fila) else '') for i, h in enumerate(headers)}
+            for fila in self._filas[1:]
+        ]
+
+    @_atomica
+    def row_values(self, fila):
+        if fila - 1 < len(self._filas):
+            return list(self._filas[fila - 1])
+        return []
+
+    @_atomica
+    def get(self, rango):
+        _, fila, col = _rango_a1(rango)
+        fin = rango.split('!')[-1].split(':')[-1]
+        fila_fin, col_fin = _celda_a1(fin)
+        fila_fin = fila_fin or len(self._filas)
+        return [
+            (self._filas[n] + [''] * col_fin)[col - 1:col_fin]
+            for n in range(fila - 1, min(fila_fin, len(self._filas)))
+        ]
+
+    # -- escritura --------------------------------------------------------------
+
+    @_atomica
+    def update_cell(self, fila, col, valor):
+        self._escribir(fila, col, [[valor]])
+
+    @_atomica
+    def update(self, values=None, range_name=None, **kwargs):
+        _, fila, col = _rango_a1(range_name or 'A1')
+        self._escribir(fila, col, values or [])
+
+    @_atomica
+    def batch_update(self, data, **kwargs):
+        for bloque in data:
+            _, fila, col = _rango_a1(bloque['range'])
+            self._escribir(fila, col, bloque['values'])
+
+    @_atomica
+    def append_row(self, values, **kwargs):
+        self._recortar()
+        self._escribir(len(self._filas) + 1, 1, [values])
+
+    @_atomica
+    def append_rows(self, values, **kwargs):
+        self._recortar()
+        self._escribir(len(self._filas) + 1, 1, values)
+
+    @_atomica
+    def delete_rows(self, inicio, fin=None):
+        del self._filas[inicio - 1:(fin or inicio)]
+
+    @_atomica
+    def clear(self):
+        self._filas = []
+
+    @_atomica
+    def add_cols(self, cols):
+        pass  # la rejilla en memoria crece sola al escribir
+
+    @_atomica
+    def update_title(self, title):
+        del self._libro._hojas[self.title]
+        self.title = title
+        self._libro._hojas[title] = self
+
+
+# =============================================================================
+# LIBRO
+# =============================================================================
+
+class LibroFalso:
+    """
+    Spreadsheet en memoria.
+    latencia: segundos añadidos a cada llamada (más jitter de hasta el 20%).
+    prob_error_cuota: probabilidad de que una llamada lance ErrorCuota.
+    """
+
+    def __init__(self, hojas=None, latencia=0.0, prob_error_cuota=0.0, semilla=0, id='libro-falso'):
+        self.id = id
+        self.latencia = latencia
+        self.prob_error_cuota = prob_error_cuota
+        self.llamadas = 0
+        self._random = random.Random(semilla)
+        self._lock = threading.Lock()
+        self._datos = threading.RLock()
+        self._hojas = {}
+        self._siguiente_id = 0
+        for nombre, filas in (hojas or {}).items():
+            self._hojas[nombre] = HojaFalsa(self, nombre, filas)
+
+    def _simular_api(self):
+        with self._lock:
+            self.llamadas += 1
+            error = self.prob_error_cuota and self._random.random() < self.prob_error_cuota
+            espera = self.latencia * (1 + 0.2 * self._random.random()) if self.latencia else 0
+        if espera:
+            time.sleep(espera)
+        if error:
+            raise ErrorCuota("Quota exceeded for quota metric 'Read requests'")
+
+    def worksheet(self, title):
+        self._simular_api()
+        if title not in self._hojas:
+            raise WorksheetNotFound(title)
+        return self._hojas[title]
+
+    def worksheets(self):
+        self._simular_api()
+        return list(self._hojas.values())
+
+    def add_worksheet(self, title, rows=1000, cols=26, **kwargs):
+        self._simular_api()
+        self._hojas[title] = HojaFalsa(self, title)
+        return self._hojas[title]
+
+    def values_batch_get(self, ranges, params=None):
+        self._simular_api()
+        rangos = []
+        with self._datos:
+            for rango in ranges:
+                hoja = rango.split('!')[0].strip("'") if '!' in rango else rango
+                ws = self._hojas[hoja]
+                ancho = max((len(f) for f in ws._filas), default=0)
+                filas = [list(f) + [''] * (ancho - len(f)) for f in ws._filas]
+                if '!' in rango:
+                    # Solo las filas y columnas pedidas ('A2:Z5', 'A:Z', '1:1'), como Sheets
+                    (fila, col), (fila_fin, col_fin) = [
+                        _celda_a1(ref) if ref[:1].isalpha() else (int(ref), None)
+                        for ref in (rango.split('!')[-1].split(':') * 2)[:2]
+                    ]
+                    filas = [f[(col or 1) - 1:col_fin] for f in filas[(fila or 1) - 1:fila_fin]]
+                rangos.append({'range': rango, 'values': filas})
+        return {'spreadsheetId': self.id, 'valueRanges': rangos}
+
+    def values_batch_update(self, body=None, **kwargs):
+        self._simular_api()
+        with self._datos:
+            for bloque in (body or {}).get('data', []):
+                hoja, fila, col = _rango_a1(bloque['range'])
+                self._hojas[hoja]._escribir(fila, col, bloque['values'])
+        return {'spreadsheetId': self.id}
+
+    def batch_update(self, body):
+        """Solo appendCells y updateCells (con userEnteredValue), que es lo que usa PadelDB."""
+        self._simular_api()
+        with self._datos:
+            por_id = {ws.id: ws for ws in self._hojas.values()}
+            for peticion in body.get('requests', []):
+                tipo, datos = next(iter(peticion.items()))
+                filas = [[_valor_introducido(c.get('userEnteredValue', {})) for c in fila.get('values', [])]
+                         for fila in datos['rows']]
+                if tipo == 'appendCells':
+                    ws = por_id[datos['sheetId']]
+                    ws._escribir(len(ws._filas) + 1, 1, filas)
+                else:
+                    inicio = datos['start']
+                    por_id[inicio['sheetId']]._escribir(inicio['rowIndex'] + 1, inicio['columnIndex'] + 1, filas)
+        return {'spreadsheetId': self.id, 'replies': [{} for _ in body.get('requests', [])]}
+
+    def hoja(self, title):
+        """Acceso directo sin contar llamada (para inspeccionar en benchmarks)."""
+        return self._hojas[title]
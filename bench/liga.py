@@ -0,0 +1,93 @@
+"""
+PadelLite Bench - Generador de ligas sintéticas
+===============================================
+Crea el contenido de USUARIOS, DISPONIBILIDAD y PARTIDOS para 1..26 grupos
+de 9 jugadores, con 4 semanas de disponibilidad y el calendario de una fase.
+"""
+import random
+from datetime import date, timedelta
+
+from bench.hojas_falsas import LibroFalso
+
+
+NIVELES = [f"M{i}" for i in range(1, 15)] + [f"F{i}" for i in range(1, 13)]
+
+HEADERS_USUARIOS = ['ID_USUARIO', 'NOMBRE', 'EMAIL', 'TELEFONO', 'PASSWORD', 'GENERO', 'NIVEL', 'ACTIVO']
+HEADERS_DISPONIBILIDAD = ['ID_USUARIO', 'FECHA', 'HORA_INICIO', 'HORA_FIN', 'NIVEL']
+HEADERS_PARTIDOS = ['ID_PARTIDO', 'ID_GRUPO', 'FASE', 'JUGADOR_1', 'JUGADOR_2', 'JUGADOR_3',
+                    'JUGADOR_4', 'FECHA', 'HORA', 'RESULTADO', 'ESTADO']
+
+PASSWORD = '1234'
+
+
+def id_jugador(grupo, n):
+    """ID con formato 'iniciales + 01' único para cada jugador de la liga."""
+    return f"{chr(65 + grupo // 26)}{chr(65 + grupo % 26)}{chr(65 + n)}01"
+
+
+def _minutos_a_hora(minutos):
+    return f"{minutos // 60:02d}:{minutos % 60:02d}"
+
+
+def _jornadas(jugadores):
+    """
+    Rotación sencilla: en cada jornada descansa un jugador y el resto forma
+    partidos de 4 rotando el orden para variar parejas.
+    """
+    n = len(jugadores)
+    jornadas = []
+    for j in range(n):
+        activos = jugadores[j + 1:] + jugadores[:j]
+        activos = activos[::2] + activos[1::2] if j % 2 else activos
+        jornadas.append([activos[k:k + 4] for k in range(0, len(activos) - 3, 4)])
+    return jornadas
+
+
+def generar_liga(n_grupos, jugadores_por_grupo=9, semanas=4, fase="25/26-F1",
+                 prob_dia=0.5, jornadas_jugadas=3, hoy=None, semilla=0):
+    """
+    Devuelve {nombre_hoja: filas} (con cabecera) para una liga de n_grupos.
+    Las primeras 'jornadas_jugadas' jornadas quedan JUGADAS, la siguiente
+    PROGRAMADA y el resto PENDIENTES.
+    """
+    rnd = random.Random(semilla)
+    hoy = hoy or date.today()
+
+    usuarios = [HEADERS_USUARIOS]
+    disponibilidad = [HEADERS_DISPONIBILIDAD]
+    partidos = [HEADERS_PARTIDOS]
+
+    for g in range(n_grupos):
+        nivel = NIVELES[g % len(NIVELES)]
+        genero = nivel[0]
+        jugadores = [id_jugador(g, n) for n in range(jugadores_por_grupo)]
+
+        for n, uid in enumerate(jugadores):
+            usuarios.append([uid, f"Jugador {nivel}-{n + 1}", f"{uid.lower()}@liga.test",
+                             f"600{g:03d}{n:03d}", PASSWORD, genero, nivel, 'TRUE'])
+
+            for d in range(semanas * 7):
+                if rnd.random() < prob_dia:
+                    inicio = rnd.choice(range(15 * 60, 20 * 60 + 1, 30))
+                    fin = min(inicio + rnd.choice((120, 150, 180, 240)), 23 * 60)
+                    disponibilidad.append([uid, (hoy + timedelta(days=d)).isoformat(),
+                                           _minutos_a_hora(inicio), _minutos_a_hora(fin), nivel])
+
+        for j, encuentros in enumerate(_jornadas(jugadores), start=1):
+            for k, cuatro in enumerate(encuentros, start=1):
+                if j <= jornadas_jugadas:
+                    fecha = (hoy - timedelta(days=7 * (jornadas_jugadas - j + 1))).isoformat()
+                    fila = [fecha, '20:00', rnd.choice(('2-0', '2-1', '1-2', '0-2')), 'JUGADO']
+                elif j == jornadas_jugadas + 1:
+                    fila = [(hoy + timedelta(days=3)).isoformat(), '20:30', '', 'PROGRAMADO']
+                else:
+                    fila = ['', '', '', 'PENDIENTE']
+                partidos.append([f"P-{nivel}-J{j}-{k:02d}", nivel, fase] + cuatro + fila)
+
+    return {'USUARIOS': usuarios, 'DISPONIBILIDAD': disponibilidad, 'PARTIDOS': partidos}
+
+
+def libro_liga(n_grupos, latencia=0.0, prob_error_cuota=0.0, semilla=0, **kwargs):
+    """LibroFalso cargado con una liga sintética."""
+    return LibroFalso(generar_liga(n_grupos, semilla=semilla, **kwargs),
+                      latencia=latencia, prob_error_cuota=prob_error_cuota, semilla=semilla)
@@ -0,0 +1,59 @@
+"""
+PadelLite Bloqueos - Exclusión entre procesos de la misma máquina
+=================================================================
+Sin caché compartida (PADELITE_CACHE_COMPARTIDA) los arriendos de la copia
+local solo valen dentro del proceso. Para que 'python mantenimiento.py
+archivar' o 'materializar' (a mano o desde cron) no compacten una hoja
+mientras la app escribe en ella, PadelDB._bloqueo toma además un flock sobre
+un fichero por libro y recurso en PADELITE_BLOQUEOS_DIR (por defecto
+<tmp>/padelite-bloqueos). Solo excluye procesos de la misma máquina: con la app
+y el mantenimiento en máquinas distintas hace falta la caché compartida en un
+volumen común.
+"""
+import os
+import re
+import tempfile
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin flock
+    fcntl = None
+
+
+def directorio():
+    return os.environ.get("PADELITE_BLOQUEOS_DIR", os.path.join(tempfile.gettempdir(), "padelite-bloqueos"))
+
+
+def disponible():
+    """True si hay flock en este sistema."""
+    return fcntl is not None
+
+
+@contextmanager
+def fichero(libro_id, recurso, espera=10):
+    """
+    flock exclusivo del recurso de un libro mientras dura el with. Si no se
+    consigue en 'espera' segundos lanza TimeoutError. Sin flock no excluye nada
+    (ver disponible()).
+    """
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(directorio(), exist_ok=True)
+    nombre = re.sub(r'[^\w.-]', '_', f"{libro_id}-{recurso}") + ".lock"
+    limite = time.time() + espera
+    with open(os.path.join(directorio(), nombre), 'a') as f:
+        while True:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.time() >= limite:
+                    raise TimeoutError(f"{recurso} está bloqueado por otro proceso")
+                time.sleep(0.05)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
@@ -0,0 +1,197 @@
+"""
+PadelLite Caché compartida - Caché entre procesos del mismo servidor (SQLite)
+=============================================================================
+Opcional: con PADELITE_CACHE_COMPARTIDA=<ruta.sqlite> todos los procesos de
+Streamlit de la máquina comparten las lecturas ya procesadas de Sheets
+(usuarios, mapa de disponibilidad, índice de partidos) en un SQLite en modo WAL.
+- Un solo refresco por clave: quien va a leer de Sheets toma un arriendo
+  (lease) con caducidad; el resto espera a que aparezca la versión nueva.
+- Invalidación por versión: cada escritura sube la versión de la clave y las
+  cachés en memoria de todas las sesiones la comparan antes de usar su copia.
+Tiene la misma interfaz que instantanea.Instantanea (PadelDB usa una u otra).
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+import ligas
+
+
+ARRIENDO = 30        # segundos que dura el arriendo de un refresco
+ESPERA_MAXIMA = 10   # segundos que se espera al refresco de otro proceso
+
+# Una por libro; se retienen las de las ligas usadas más recientemente (ver ligas.py)
+_instancias = ligas.Recientes()
+
+
+def ruta_configurada():
+    return os.environ.get("PADELITE_CACHE_COMPARTIDA", "")
+
+
+def para_libro(libro_id):
+    """Caché compartida del proceso para un libro (None si no está configurada)."""
+    ruta = ruta_configurada()
+    if not ruta:
+        return None
+    return _instancias.obtener(libro_id, lambda: CacheCompartida(ruta, libro_id))
+
+
+class CacheCompartida:
+    """Entradas y arriendos de un libro dentro del SQLite compartido."""
+
+    def __init__(self, ruta, libro_id=''):
+        self.ruta = ruta
+        self.libro_id = libro_id
+        self._hilo = threading.local()
+        self._decodificadas = {}   # {clave: (version, datos)} para no deserializar en cada lectura
+        self._revalidadas = set()
+        self._lock = threading.Lock()
+        self._duenyo_base = f"{os.uname().nodename if hasattr(os, 'uname') else ''}-{os.getpid()}"
+        con = self._con()
+        con.execute("""CREATE TABLE IF NOT EXISTS entradas (
+            libro TEXT, clave TEXT, version INTEGER, ts REAL, vigente INTEGER, datos BLOB,
+            PRIMARY KEY (libro, clave))""")
+        con.execute("""CREATE TABLE IF NOT EXISTS arriendos (
+            libro TEXT, clave TEXT, duenyo TEXT, hasta REAL,
+            PRIMARY KEY (libro, clave))""")
+        # Versiones anteriores guardaban USUARIOS con PASSWORD en claro
+        con.execute("DELETE FROM entradas WHERE clave = 'usuarios_data'")
+
+    def _con(self):
+        """Una conexión por hilo (sqlite3 no comparte conexiones entre hilos)."""
+        con = getattr(self._hilo, 'con', None)
+        if con is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.ruta)), exist_ok=True)
+            con = sqlite3.connect(self.ruta, timeout=10, isolation_level=None)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            self._hilo.con = con
+        return con
+
+    def _duenyo(self):
+        return f"{self._duenyo_base}-{threading.get_ident()}"
+
+    # -------------------------------------------------------------------------
+    # ENTRADAS
+    # -------------------------------------------------------------------------
+
+    def obtener(self, clave):
+        fila = self._con().execute(
+            "SELECT version, ts, vigente FROM entradas WHERE libro = ? AND clave = ?",
+            (self.libro_id, clave)).fetchone()
+        if fila is None:
+            return None
+        version, ts, vigente = fila
+        with self._lock:
+            memo = self._decodificadas.get(clave)
+        if memo is None or memo[0] != version:
+            blob = self._con().execute(
+                "SELECT datos FROM entradas WHERE libro = ? AND clave = ? AND version = ?",
+                (self.libro_id, clave, version)).fetchone()
+            if blob is None:  # se ha escrito otra versión entre las dos consultas
+                return self.obtener(clave)
+            memo = (version, pickle.loads(blob[0]))
+            with self._lock:
+                self._decodificadas[clave] = memo
+        return {'datos': memo[1], 'ts': ts, 'version': version, 'vigente': bool(vigente)}
+
+    def version_vigente(self, clave):
+        """Versión de la clave si es vigente, si no None (consulta barata, sin datos)."""
+        fila = self._con().execute(
+            "SELECT version FROM entradas WHERE libro = ? AND clave = ? AND vigente = 1",
+            (self.libro_id, clave)).fetchone()
+        return fila[0] if fila else None
+
+    def guardar(self, clave, datos, ts=None, si_version=None):
+        """
+        Guarda una versión nueva de la clave y devuelve su número. Con si_version
+        solo se guarda si la clave sigue en esa versión (si no, devuelve None).
+        """
+        blob = pickle.dumps(datos, protocol=pickle.HIGHEST_PROTOCOL)
+        con = self._con()
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            fila = con.execute("SELECT version FROM entradas WHERE libro = ? AND clave = ?",
+                               (self.libro_id, clave)).fetchone()
+            if si_version is not None and (fila[0] if fila else 0) != si_version:
+                con.execute("ROLLBACK")
+                return None
+            version = (fila[0] if fila else 0) + 1
+            con.execute("INSERT OR REPLACE INTO entradas VALUES (?, ?, ?, ?, 1, ?)",
+                        (self.libro_id, clave, version, ts or time.time(), blob))
+            con.execute("COMMIT")
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
+        with self._lock:
+            self._decodificadas[clave] = (version, datos)
+            self._revalidadas.add(clave)
+        return version
+
+    def invalidar(self, clave=None):
+        """Marca la clave (o todas) como no vigente y sube su versión."""
+        if clave:
+            self._con().execute(
+                "UPDATE entradas SET vigente = 0, version = version + 1 WHERE libro = ? AND clave = ?",
+                (self.libro_id, clave))
+        else:
+            self._con().execute(
+                "UPDATE entradas SET vigente = 0, version = version + 1 WHERE libro = ?", (self.libro_id,))
+
+    def hay_datos(self):
+        return self._con().execute(
+            "SELECT 1 FROM entradas WHERE libro = ? LIMIT 1", (self.libro_id,)).fetchone() is not None
+
+    def pendiente_de_revalidar(self, clave):
+        """True la primera vez que este proceso ve una clave que no ha refrescado él."""
+        with self._lock:
+            if clave in self._revalidadas:
+                return False
+            self._revalidadas.add(clave)
+            return True
+
+    # -------------------------------------------------------------------------
+    # ARRIENDOS (un solo refresco por clave entre todos los procesos)
+    # -------------------------------------------------------------------------
+
+    def tomar_arriendo(self, clave, segundos=ARRIENDO):
+        """True si este hilo puede refrescar la clave (nadie más lo está haciendo)."""
+        ahora = time.time()
+        con = self._con()
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            fila = con.execute("SELECT duenyo, hasta FROM arriendos WHERE libro = ? AND clave = ?",
+                               (self.libro_id, clave)).fetchone()
+            if fila and fila[1] > ahora and fila[0] != self._duenyo():
+                con.execute("ROLLBACK")
+                return False
+            con.execute("INSERT OR REPLACE INTO arriendos VALUES (?, ?, ?, ?)",
+                        (self.libro_id, clave, self._duenyo(), ahora + segundos))
+            con.execute("COMMIT")
+            return True
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
+
+    def soltar_arriendo(self, clave):
+        self._con().execute("DELETE FROM arriendos WHERE libro = ? AND clave = ? AND duenyo = ?",
+                            (self.libro_id, clave, self._duenyo()))
+
+    def esperar(self, clave, version_anterior, maximo=ESPERA_MAXIMA):
+        """
+        Espera a que quien tiene el arriendo publique una versión vigente nueva.
+        Devuelve la entrada, o None si el arriendo desaparece sin resultado o se agota el tiempo.
+        """
+        limite = time.time() + maximo
+        while time.time() < limite:
+            version = self.version_vigente(clave)
+            if version is not None and version != version_anterior:
+                return self.obtener(clave)
+            arriendo = self._con().execute(
+                "SELECT hasta FROM arriendos WHERE libro = ? AND clave = ?", (self.libro_id, clave)).fetchone()
+            if arriendo is None or arriendo[0] < time.time():
+                return None
+            time.sleep(0.05)
+        return None
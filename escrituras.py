@@ -0,0 +1,96 @@
+"""
+PadelLite Escrituras - Agrupación de guardados simultáneos (group commit)
+=========================================================================
+Cuando varias sesiones del proceso guardan sobre la misma hoja casi a la vez
+(todo un grupo poniendo su disponibilidad tras un aviso por WhatsApp), se
+escriben juntas en una sola tanda de llamadas a Sheets:
+- si no hay nada escribiéndose en esa hoja, el guardado sale enseguida;
+- los que llegan mientras tanto esperan y salen todos juntos en la tanda
+  siguiente (más PADELITE_VENTANA_ESCRITURA segundos si se configura, para
+  juntar aún más a costa de latencia; por defecto 0).
+Cada sesión recibe su propio Future: si la tanda falla se reintenta cada
+guardado por separado y cada uno obtiene su resultado.
+"""
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+
+VENTANA = float(os.environ.get("PADELITE_VENTANA_ESCRITURA", "0"))  # segundos
+MAXIMO = 50  # guardados por tanda
+
+
+class _Cola:
+    """Guardados pendientes de una clave y la función que los escribe."""
+
+    def __init__(self):
+        self.elementos = []
+        self.futuros = []
+        self.escribir = None
+        self.ocupada = False
+
+
+class Agrupador:
+    """Agrupa por clave (p. ej. libro + hoja) los guardados que coinciden en el tiempo."""
+
+    def __init__(self, ventana=VENTANA, maximo=MAXIMO):
+        self.ventana = ventana
+        self.maximo = maximo
+        self._colas = {}
+        self._lock = threading.Lock()
+
+    def enviar(self, clave, elemento, escribir):
+        """
+        Encola 'elemento' y devuelve un Future con su resultado. escribir(elementos)
+        escribe una lista de elementos en una sola tanda (se usa la del último
+        guardado encolado: la clave debe identificar dónde y cómo se escribe).
+        """
+        futuro = Future()
+        with self._lock:
+            cola = self._colas.setdefault(clave, _Cola())
+            cola.elementos.append(elemento)
+            cola.futuros.append(futuro)
+            cola.escribir = escribir
+            arrancar = not cola.ocupada
+            cola.ocupada = True
+        if arrancar:
+            threading.Thread(target=self._vaciar, args=(clave, cola), name="escrituras", daemon=True).start()
+        return futuro
+
+    def _vaciar(self, clave, cola):
+        """Escribe tandas de la cola hasta dejarla vacía."""
+        while True:
+            if self.ventana > 0:
+                time.sleep(self.ventana)
+            with self._lock:
+                if not cola.elementos:
+                    cola.ocupada = False
+                    del self._colas[clave]
+                    return
+                elementos, futuros = cola.elementos[:self.maximo], cola.futuros[:self.maximo]
+                del cola.elementos[:self.maximo], cola.futuros[:self.maximo]
+                escribir = cola.escribir
+            self._escribir(escribir, elementos, futuros)
+
+    def _escribir(self, escribir, elementos, futuros):
+        try:
+            escribir(elementos)
+        except Exception as e:
+            if len(elementos) == 1:
+                futuros[0].set_exception(e)
+                return
+            # La tanda ha fallado: cada guardado por separado, con su propio resultado
+            for elemento, futuro in zip(elementos, futuros):
+                try:
+                    escribir([elemento])
+                except Exception as e_individual:
+                    futuro.set_exception(e_individual)
+                else:
+                    futuro.set_result(True)
+            return
+        for futuro in futuros:
+            futuro.set_result(True)
+
+
+agrupador = Agrupador()
@@ -0,0 +1,154 @@
+"""
+PadelLite Instantánea - Copia local de las lecturas de Sheets
+=============================================================
+Guarda en disco (pickle, un fichero por libro) los datos ya procesados de la
+caché de PadelDB (usuarios, disponibilidad, índice de partidos) con la hora y
+versión de cada entrada. Sirve para:
+- arrancar en caliente: tras un reinicio la primera lectura de cada clave sale
+  del fichero y se revalida en segundo plano;
+- modo degradado: si Sheets no responde se sirve la última copia (solo lectura).
+El fichero lo escribe solo la propia app (PADELITE_INSTANTANEA_DIR, por defecto
+.padelite_cache/); no cargar ficheros de otro origen.
+"""
+import os
+import pickle
+import threading
+import time
+
+import ligas
+
+
+FORMATO = 2  # 2: USUARIOS sin PASSWORD en claro (se descartan las copias anteriores)
+ESPERA_ESCRITURA = 5  # segundos: se agrupan las escrituras a disco
+
+# Una por libro; se retienen las de las ligas usadas más recientemente (ver ligas.py)
+_instancias = ligas.Recientes()
+
+
+def activada():
+    return os.environ.get("PADELITE_INSTANTANEA", "1") != "0"
+
+
+def directorio():
+    return os.environ.get("PADELITE_INSTANTANEA_DIR", ".padelite_cache")
+
+
+def para_libro(libro_id):
+    """Instantánea compartida por todas las sesiones del proceso para un libro."""
+    return _instancias.obtener(libro_id, lambda: Instantanea(os.path.join(directorio(), f"{libro_id}.pkl"), libro_id))
+
+
+class Instantanea:
+    """
+    Entradas {clave: {'datos', 'ts', 'version', 'vigente'}}. 'vigente' pasa a
+    False al invalidar: la copia ya no vale para lecturas normales, solo como
+    último recurso sin conexión.
+    """
+
+    def __init__(self, ruta, libro_id=''):
+        self.ruta = ruta
+        self.libro_id = libro_id
+        self.version = 0
+        self.entradas = {}
+        self.cargada_de_disco = set()  # claves aún sin revalidar desde el arranque
+        self._lock = threading.Lock()
+        self._temporizador = None
+        self.cargar()
+
+    # -------------------------------------------------------------------------
+    # DISCO
+    # -------------------------------------------------------------------------
+
+    def cargar(self):
+        try:
+            with open(self.ruta, 'rb') as f:
+                contenido = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return
+        if contenido.get('formato') != FORMATO or contenido.get('libro') != self.libro_id:
+            return
+        with self._lock:
+            self.version = contenido.get('version', 0)
+            self.entradas = contenido.get('entradas', {})
+            self.cargada_de_disco = set(self.entradas)
+
+    def escribir(self):
+        """Vuelca a disco de forma atómica (fichero temporal + rename)."""
+        with self._lock:
+            self._temporizador = None
+            contenido = {'formato': FORMATO, 'libro': self.libro_id,
+                         'version': self.version, 'entradas': dict(self.entradas)}
+        try:
+            os.makedirs(os.path.dirname(self.ruta) or '.', exist_ok=True)
+            temporal = f"{self.ruta}.{os.getpid()}.tmp"
+            with open(os.open(temporal, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'wb') as f:
+                pickle.dump(contenido, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporal, self.ruta)
+        except OSError as e:
+            print(f"Error escribiendo instantánea: {e}")
+
+    def _programar_escritura(self):
+        # Llamar con self._lock tomado
+        if self._temporizador is None:
+            self._temporizador = threading.Timer(ESPERA_ESCRITURA, self.escribir)
+            self._temporizador.daemon = True
+            self._temporizador.start()
+
+    # -------------------------------------------------------------------------
+    # ENTRADAS
+    # -------------------------------------------------------------------------
+
+    def obtener(self, clave):
+        with self._lock:
+            return self.entradas.get(clave)
+
+    def guardar(self, clave, datos, ts=None, si_version=None):
+        """Guarda la clave y devuelve su versión (None si ya no estaba en si_version)."""
+        with self._lock:
+            if si_version is not None and self.entradas.get(clave, {}).get('version', 0) != si_version:
+                return None
+            self.version += 1
+            self.entradas[clave] = {'datos': datos, 'ts': ts or time.time(),
+                                    'version': self.version, 'vigente': True}
+            self.cargada_de_disco.discard(clave)
+            self._programar_escritura()
+            return self.version
+
+    def invalidar(self, clave=None):
+        with self._lock:
+            claves = [clave] if clave else list(self.entradas)
+            for c in claves:
+                if c in self.entradas:
+                    self.version += 1
+                    self.entradas[c] = dict(self.entradas[c], vigente=False, version=self.version)
+                self.cargada_de_disco.discard(c)
+            self._programar_escritura()
+
+    def pendiente_de_revalidar(self, clave):
+        """True la primera vez que se pide una clave cargada del fichero (y la marca)."""
+        with self._lock:
+            if clave in self.cargada_de_disco:
+                self.cargada_de_disco.discard(clave)
+                return True
+            return False
+
+    def version_vigente(self, clave):
+        with self._lock:
+            entrada = self.entradas.get(clave)
+            return entrada['version'] if entrada and entrada['vigente'] else None
+
+    def hay_datos(self):
+        return bool(self.entradas)
+
+    # -------------------------------------------------------------------------
+    # ARRIENDOS (misma interfaz que cache_compartida; en un solo proceso no hacen falta)
+    # -------------------------------------------------------------------------
+
+    def tomar_arriendo(self, clave, segundos=None):
+        return True
+
+    def soltar_arriendo(self, clave):
+        pass
+
+    def esperar(self, clave, version_anterior, maximo=None):
+        return None
@@ -0,0 +1,95 @@
+"""
+PadelLite Jornadas - Calendario de una fase
+===========================================
+Rotación de parejas para un grupo de n jugadores por el método del círculo:
+cada jugador hace pareja con cada uno de los demás una sola vez en la fase.
+Cada jornada las parejas se juntan de dos en dos en partidos; con n impar
+descansa un jugador por jornada (cada uno una vez). Grupo de 9: 9 jornadas de
+2 partidos.
+
+Con n ≡ 2 ó 3 (mód 4) hay un nº impar de parejas posibles, así que no todas
+pueden jugar: cada jornada sobra una pareja (la del centro del círculo), y
+las que sobran se juegan al final en 2 jornadas más (3 con n ≡ 3). Queda sin
+jugar una sola pareja; sus dos jugadores juegan un partido menos que el resto.
+Grupo de 10: 11 jornadas, 44 de las 45 parejas.
+"""
+from functools import lru_cache
+
+
+def _juntar(parejas, rivales):
+    """
+    Junta un nº par de parejas en partidos de dos parejas: a cada pareja se le
+    busca, entre las que quedan, la que menos veces se ha enfrentado a ella.
+    """
+    def enfrentamientos(x, y):
+        return sum(rivales.get((min(p, q), max(p, q)), 0) for p in x for q in y)
+
+    libres = list(parejas)
+    partidos = []
+    while libres:
+        primera = libres.pop(0)
+        otra = min(libres, key=lambda pareja: enfrentamientos(primera, pareja))
+        libres.remove(otra)
+        partidos.append(primera + otra)
+    return partidos
+
+
+@lru_cache(maxsize=None)
+def rotacion(n):
+    """
+    Jornadas para n jugadores (índices 0..n-1): lista de jornadas, cada una
+    una lista de partidos (a, b, c, d) = pareja a-b contra pareja c-d.
+    """
+    if n < 4:
+        return []
+    # Fijo el primero (None = descanso con n impar); el resto gira en círculo
+    fijo, ciclo = (None, list(range(n))) if n % 2 else (0, list(range(1, n)))
+    largo = len(ciclo)
+    rivales = {}
+    jornadas = []
+
+    def jugar(partidos):
+        for a, b, c, d in partidos:
+            for p in (a, b):
+                for q in (c, d):
+                    rivales[(min(p, q), max(p, q))] = rivales.get((min(p, q), max(p, q)), 0) + 1
+        jornadas.append(partidos)
+
+    for r in range(largo):
+        posiciones = [fijo] + ciclo[-r:] + ciclo[:-r] if r else [fijo] + ciclo
+        m = len(posiciones)
+        parejas = [(posiciones[i], posiciones[m - 1 - i]) for i in range(m // 2)]
+        parejas = [p for p in parejas if None not in p]
+        if len(parejas) % 2:
+            # Sobra la del centro: son dos vecinos del ciclo, distintos en cada jornada
+            parejas.pop()
+        jugar(_juntar(parejas, rivales))
+
+    if n % 4 in (2, 3):
+        # Las parejas que sobraron son los vecinos del ciclo c[i]-c[i+1]: se juntan
+        # c[i]-c[i+1] contra c[i+2]-c[i+3] en dos jornadas sin jugadores repetidos
+        c = ciclo + ciclo
+        bloques = range(0, largo - largo % 4, 4)
+        jugar([tuple(c[i:i + 4]) for i in bloques])
+        jugar([tuple(c[i + 1:i + 5]) for i in bloques])
+        if largo % 4 == 3:
+            jugar([tuple(c[largo - 3:largo]) + (c[0],)])
+    return jornadas
+
+
+def id_partido(nivel, jornada, partido):
+    """ID con el formato de la hoja: P-M2-J4-01."""
+    return f"P-{nivel}-J{jornada}-{partido:02d}"
+
+
+def partidos_fase(jugadores, nivel, primera_jornada=1):
+    """
+    [(id_partido, [j1, j2, j3, j4])] de la fase para los jugadores de un nivel
+    (en el orden dado; JUGADOR_1/2 contra JUGADOR_3/4). Las jornadas se numeran
+    desde primera_jornada para no repetir IDs de fases anteriores.
+    """
+    return [
+        (id_partido(nivel, j, k), [jugadores[i] for i in cuatro])
+        for j, partidos in enumerate(rotacion(len(jugadores)), start=primera_jornada)
+        for k, cuatro in enumerate(partidos, start=1)
+    ]
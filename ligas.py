@@ -0,0 +1,86 @@
+"""
+PadelLite Ligas - Varias ligas (libros de Sheets) en un mismo despliegue
+========================================================================
+Cada liga (club, temporada...) es un libro de Google Sheets con las mismas
+hojas. Se configuran con nombre e ID del libro:
+- PADELITE_LIGAS="club-a=<id libro>,club-b=<id libro>", o
+- una sección [ligas] en los secrets de Streamlit (club-a = "<id libro>").
+Sin configuración hay una sola liga, 'principal', con el libro de siempre.
+La liga se elige con ?liga=<nombre> en la URL (solo las configuradas) o, por
+defecto, PADELITE_LIGA o la primera.
+
+Recientes guarda por liga lo que es caro de rehacer (libro abierto, copia
+local): se retienen los PADELITE_MAX_LIGAS usados más recientemente y el resto
+solo mientras alguna sesión los esté usando, así un proceso puede servir
+muchas ligas sin reconectar en cada cambio ni crecer sin límite.
+"""
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from functools import lru_cache
+
+
+LIBRO_PRINCIPAL = '15MAbaPH1gqrCIcUtj6JgdSJXiYMdOBNIxaOqtAHsOB0'
+MAXIMO = int(os.environ.get("PADELITE_MAX_LIGAS", "8"))  # ligas retenidas en memoria
+
+
+@lru_cache(maxsize=1)
+def configuradas():
+    """{nombre de liga: ID del libro}, en el orden en que se configuraron."""
+    ligas = {}
+    for par in os.environ.get("PADELITE_LIGAS", "").split(','):
+        if '=' in par:
+            nombre, libro = par.split('=', 1)
+            ligas[nombre.strip()] = libro.strip()
+    if not ligas:
+        try:
+            import streamlit as st
+            if hasattr(st, 'secrets') and "ligas" in st.secrets:
+                ligas = {str(k): str(v) for k, v in st.secrets["ligas"].items()}
+        except Exception:
+            pass
+    return ligas or {'principal': LIBRO_PRINCIPAL}
+
+
+def por_defecto():
+    liga = os.environ.get("PADELITE_LIGA", "")
+    return liga if liga in configuradas() else next(iter(configuradas()))
+
+
+def libro(liga=None):
+    """ID del libro de una liga configurada (la de por defecto si no se indica)."""
+    liga = liga or por_defecto()
+    if liga not in configuradas():
+        raise ValueError(f"Liga desconocida: {liga!r}")
+    return configuradas()[liga]
+
+
+class Recientes:
+    """
+    Objetos por clave (ID de libro) creados una vez por proceso. Los 'maximo'
+    usados más recientemente se retienen; los demás viven mientras alguien
+    tenga referencia (p. ej. una sesión abierta de esa liga) y luego se liberan.
+    """
+
+    def __init__(self, maximo=MAXIMO):
+        self.maximo = maximo
+        self._vivos = weakref.WeakValueDictionary()
+        self._recientes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave, crear):
+        with self._lock:
+            objeto = self._vivos.get(clave)
+            if objeto is None:
+                objeto = self._vivos[clave] = crear()
+            self._recientes[clave] = objeto
+            self._recientes.move_to_end(clave)
+            while len(self._recientes) > self.maximo:
+                self._recientes.popitem(last=False)
+            return objeto
+
+    def claves(self):
+        """Claves retenidas, de la menos a la más reciente."""
+        with self._lock:
+            return list(self._recientes)
@@ -0,0 +1,105 @@
+"""
+PadelLite Mantenimiento - Tareas de la hoja bajo demanda
+========================================================
+Uso:
+    python mantenimiento.py archivar                  # días anteriores a hoy
+    python mantenimiento.py archivar --hasta 2026-01-01
+    python mantenimiento.py particionar               # una sola vez
+    python mantenimiento.py eventos                   # activar el registro de eventos
+    python mantenimiento.py materializar
+    python mantenimiento.py versiones                 # columna VERSION en PARTIDOS
+    python mantenimiento.py jugados                   # PROGRAMADO terminados -> JUGADO
+    python mantenimiento.py fase 26/27-F1             # partidos de una fase nueva
+    python mantenimiento.py fase 26/27-F1 --niveles M1,M2
+    python mantenimiento.py usuarios temporada.csv --simular
+    python mantenimiento.py usuarios temporada.csv [--sin-bajas]
+    python mantenimiento.py --liga club-b jugados      # otra liga (ver ligas.py)
+
+La app ya archiva una vez al día (PADELITE_ARCHIVO_DIARIO=0 lo desactiva);
+esto sirve para lanzarlo a mano o desde cron.
+'particionar' reparte DISPONIBILIDAD y PARTIDOS en hojas por nivel
+(DISPONIBILIDAD_M2, PARTIDOS_M2...); la app las usa en cuanto existen.
+'eventos' crea EVENTOS_<hoja> para cada hoja de disponibilidad: a partir de
+ahí cada guardado es un append_rows y 'materializar' (la app lo hace cada
+hora) vuelca los eventos en la hoja.
+'versiones' añade VERSION a las hojas de PARTIDOS: los cambios de partido
+comprueban además la versión que vio el jugador.
+'jugados' pasa a JUGADO los partidos programados que ya han terminado (la
+app lo hace cada cuarto de hora).
+'fase' crea los partidos PENDIENTE de una fase nueva para cada nivel con sus
+jugadores activos (cada jugador hace pareja una vez con cada compañero).
+'usuarios' sincroniza USUARIOS con un CSV (separado por comas o punto y coma,
+con cabecera ID_USUARIO, NIVEL y las columnas que se quieran actualizar):
+altas, cambios y desactivación de los que faltan en sus niveles, en una sola
+escritura. --simular solo enseña el diff.
+"""
+import argparse
+import csv
+import sys
+
+from backend import PadelDB
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tareas de mantenimiento de PadelLite")
+    parser.add_argument('--liga', help="liga sobre la que trabajar (por defecto la de PADELITE_LIGA o la primera)")
+    sub = parser.add_subparsers(dest='tarea', required=True)
+    archivar = sub.add_parser('archivar', help="mover la disponibilidad pasada a DISPONIBILIDAD_ARCHIVO")
+    archivar.add_argument('--hasta', help="archivar fechas anteriores a esta (YYYY-MM-DD, por defecto hoy)")
+    sub.add_parser('particionar', help="migrar DISPONIBILIDAD y PARTIDOS a una hoja por nivel")
+    sub.add_parser('eventos', help="activar el registro de eventos de disponibilidad")
+    sub.add_parser('materializar', help="volcar los eventos de disponibilidad en sus hojas")
+    sub.add_parser('versiones', help="añadir la columna VERSION a las hojas de PARTIDOS")
+    sub.add_parser('jugados', help="pasar a JUGADO los partidos programados ya terminados")
+    fase = sub.add_parser('fase', help="crear los partidos de una fase nueva en todos los niveles")
+    fase.add_argument('fase', help="nombre de la fase (columna FASE), p. ej. 26/27-F1")
+    fase.add_argument('--niveles', help="solo estos niveles, separados por comas")
+    usuarios = sub.add_parser('usuarios', help="sincronizar USUARIOS con un CSV")
+    usuarios.add_argument('csv', help="fichero CSV con cabecera (ID_USUARIO, NIVEL, GENERO, ACTIVO...)")
+    usuarios.add_argument('--simular', action='store_true', help="solo enseñar los cambios, sin escribir")
+    usuarios.add_argument('--sin-bajas', action='store_true',
+                          help="no desactivar a los usuarios que no están en el CSV")
+    args = parser.parse_args(argv)
+
+    db = PadelDB(liga=args.liga)
+    if args.tarea == 'archivar':
+        n = db.archivar_disponibilidad(args.hasta)
+        print(f"📦 {n} filas archivadas en DISPONIBILIDAD_ARCHIVO")
+    elif args.tarea == 'particionar':
+        for hoja, n in sorted(db.particionar_hojas().items()):
+            print(f"  {hoja}: {n} filas")
+        print("✅ Hojas originales renombradas a '<HOJA> (sin particionar)'")
+    elif args.tarea == 'eventos':
+        creadas = db.activar_eventos_disponibilidad()
+        print(f"📝 Hojas de eventos creadas: {', '.join(creadas) or 'ninguna (ya existían)'}")
+    elif args.tarea == 'materializar':
+        print(f"📦 {db.materializar_disponibilidad()} eventos materializados")
+    elif args.tarea == 'versiones':
+        hojas = db.activar_versiones_partidos()
+        print(f"🔢 Columna VERSION añadida a: {', '.join(hojas) or 'ninguna (ya existía)'}")
+    elif args.tarea == 'jugados':
+        print(f"🎾 {db.marcar_jugados()} partidos marcados como JUGADO")
+    elif args.tarea == 'fase':
+        creados = db.generar_fase(args.fase, args.niveles.split(',') if args.niveles else None)
+        for nivel, n in sorted(creados.items()):
+            print(f"  {nivel}: {n} partidos" if isinstance(n, int) else f"  ⚠️ {nivel}: saltado, {n}")
+        print(f"📅 {sum(n for n in creados.values() if isinstance(n, int))} partidos creados para {args.fase} "
+              f"(los niveles que ya la tenían se saltan)")
+    elif args.tarea == 'usuarios':
+        with open(args.csv, newline='', encoding='utf-8-sig') as f:
+            muestra = f.read(4096)
+            f.seek(0)
+            filas = list(csv.DictReader(f, dialect=csv.Sniffer().sniff(muestra, delimiters=',;')))
+        try:
+            resumen = db.importar_usuarios(filas, desactivar_ausentes=not args.sin_bajas, simular=args.simular)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 1
+        for tipo, ids in resumen.items():
+            print(f"  {tipo}: {len(ids)}" + (f" ({', '.join(ids)})" if ids else ""))
+        print("🔎 Simulación: no se ha escrito nada" if args.simular else "👥 USUARIOS sincronizada")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+PadelLite Memoria - Cuentas de memoria por sesión y desalojo de inactivas
+=========================================================================
+Cada sesión de Streamlit tiene su PadelDB con su caché de hojas enteras y sus
+cachés en session_state (mis_slots_cache, disponibles_cache...). En cada rerun
+la app llama a tocar(): así se sabe cuánto ocupa aproximadamente cada sesión
+y cada clave de caché, y cuándo se usó por última vez.
+
+Cada DESALOJO_CADA segundos se repasan las sesiones: si el total estimado pasa
+de PADELITE_MEMORIA_MB (0 = sin presupuesto: siempre) se desalojan, de la más
+antigua a la más reciente, las inactivas desde hace PADELITE_SESION_INACTIVA
+segundos: su PadelDB suelta la caché en memoria en ese momento y, al volver,
+tocar() devuelve True para que la app suelte también sus cachés de sesión y
+todo se reconstruya (desde la copia compartida, sin ir a Sheets si es reciente).
+
+Los tamaños son aproximados (estimados por muestreo, ver metricas.tamano_aprox) y un
+mismo objeto compartido por varias sesiones (la copia local de instantanea.py)
+se cuenta una sola vez en el total. Informe: ?admin=<token>&metricas=memoria.
+"""
+import os
+import threading
+import time
+import weakref
+
+import metricas
+
+
+PRESUPUESTO = float(os.environ.get("PADELITE_MEMORIA_MB", "0")) * 1024 * 1024  # bytes; 0 = sin límite
+INACTIVA = float(os.environ.get("PADELITE_SESION_INACTIVA", "600"))  # segundos sin rerun
+DESALOJO_CADA = 30  # segundos entre repasos
+
+
+class _Sesion:
+    """Lo que se sabe de una sesión: su PadelDB (referencia débil) y sus tamaños."""
+
+    def __init__(self, db):
+        self.db = weakref.ref(db)
+        self.usuario = None
+        self.ultimo_uso = 0.0
+        self.bytes_sesion = {}   # {nombre en session_state: bytes}
+        self.desalojada = False
+
+
+_sesiones = {}
+_lock = threading.Lock()
+_repasador = None
+
+
+def tocar(sesion_id, db, usuario=None, caches=None, ahora=None):
+    """
+    Marca la sesión como usada ahora y anota el tamaño de sus cachés de sesión
+    ({nombre: objeto}). Devuelve True si se desalojó mientras estaba inactiva:
+    la app debe soltar esas cachés para que se reconstruyan.
+    """
+    global _repasador
+    ahora = time.time() if ahora is None else ahora
+    tamanos = {nombre: metricas.tamano_aprox(obj) for nombre, obj in (caches or {}).items()}
+    with _lock:
+        sesion = _sesiones.get(sesion_id)
+        if sesion is None or sesion.db() is not db:
+            sesion = _sesiones[sesion_id] = _Sesion(db)
+        sesion.usuario = usuario
+        sesion.ultimo_uso = ahora
+        sesion.bytes_sesion = tamanos
+        desalojada, sesion.desalojada = sesion.desalojada, False
+        if _repasador is None:
+            _repasador = threading.Thread(target=_repasar_siempre, name="memoria", daemon=True)
+            _repasador.start()
+    return desalojada
+
+
+def _cuentas():
+    """
+    [(sesion_id, sesion, {clave: (id, bytes)}, bytes de sesión)] de las sesiones
+    vivas. Los tamaños se calculan fuera del candado para no frenar a tocar().
+    """
+    with _lock:
+        vivas = []
+        for sesion_id, sesion in list(_sesiones.items()):
+            db = sesion.db()
+            if db is None:
+                del _sesiones[sesion_id]   # sesión cerrada: su PadelDB ya no existe
+            else:
+                vivas.append((sesion_id, sesion, db))
+    return [(sesion_id, sesion, db.tamano_cache(), sum(sesion.bytes_sesion.values()))
+            for sesion_id, sesion, db in vivas]
+
+
+def _total(cuentas):
+    """Bytes estimados del proceso: cada objeto de caché compartido cuenta una vez."""
+    objetos = {}
+    for _, _, claves, _ in cuentas:
+        objetos.update(claves.values())
+    return sum(objetos.values()) + sum(bytes_sesion for _, _, _, bytes_sesion in cuentas)
+
+
+def repasar(ahora=None):
+    """Desaloja sesiones inactivas mientras se pase del presupuesto. Devuelve cuántas."""
+    ahora = time.time() if ahora is None else ahora
+    cuentas = _cuentas()
+    total = _total(cuentas)
+    usos = {}   # {id de objeto: nº de sesiones que lo tienen}: solo se libera al soltarlo la última
+    for _, _, claves, _ in cuentas:
+        for i, _ in set(claves.values()):
+            usos[i] = usos.get(i, 0) + 1
+    
+    desalojadas = 0
+    for _, sesion, claves, _ in sorted(cuentas, key=lambda c: c[1].ultimo_uso):
+        if PRESUPUESTO and total <= PRESUPUESTO:
+            break
+        with _lock:
+            # Se vuelve a mirar con el candado: la sesión puede haber vuelto entretanto
+            if ahora - sesion.ultimo_uso <= INACTIVA or sesion.desalojada:
+                continue
+            db = sesion.db()
+            if db is not None:
+                db.soltar_memoria()
+            sesion.desalojada = True
+        desalojadas += 1
+        for i, b in set(claves.values()):
+            usos[i] -= 1
+            if not usos[i]:
+                total -= b
+    if desalojadas:
+        metricas.registro.incrementar('padelite_sesiones_desalojadas_total', desalojadas)
+    return desalojadas
+
+
+def _repasar_siempre():
+    while True:
+        time.sleep(DESALOJO_CADA)
+        try:
+            repasar()
+        except Exception as e:
+            print(f"Error repasando la memoria de las sesiones: {e}")
+
+
+def informe(ahora=None):
+    """Memoria aproximada por sesión y por clave de caché, y el total del proceso."""
+    ahora = time.time() if ahora is None else ahora
+    cuentas = _cuentas()
+    por_clave = {}
+    vistos = set()
+    for _, _, claves, _ in cuentas:
+        for clave, (i, b) in claves.items():
+            if (clave, i) not in vistos:
+                vistos.add((clave, i))
+                por_clave[clave] = por_clave.get(clave, 0) + b
+    return {
+        'presupuesto_bytes': PRESUPUESTO,
+        'total_bytes': _total(cuentas),
+        'por_clave': dict(sorted(por_clave.items(), key=lambda kv: -kv[1])),
+        'sesiones': [
+            {
+                'sesion': sesion_id[:8],
+                'usuario': sesion.usuario,
+                'inactiva_s': round(ahora - sesion.ultimo_uso),
+                'desalojada': sesion.desalojada,
+                'cache_bytes': sum(b for _, b in claves.values()),
+                'sesion_bytes': sesion.bytes_sesion,
+            }
+            for sesion_id, sesion, claves, _ in sorted(cuentas, key=lambda c: c[1].ultimo_uso)
+        ],
+    }
@@ -0,0 +1,358 @@
+"""
+PadelLite Métricas - Registro de instrumentación en proceso
+===========================================================
+Latencias (histogramas), nº de llamadas a Sheets, reintentos, bytes y
+aciertos/fallos de caché. Se vuelca como JSON o en formato texto de Prometheus.
+"""
+import contextvars
+import importlib
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+
+# Referencia del arranque en frío: primera importación de este módulo
+_INICIO = time.perf_counter()
+
+
+# Límites de los histogramas de latencia (segundos)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Resultados de padelite_cache_total servidos sin leer de Sheets (ver PadelDB._get_cached)
+RESULTADOS_ACIERTO = ('hit', 'instantanea', 'caducado', 'compartida', 'en_vuelo')
+
+# Pantalla activa (login, calendario, partidos...) para etiquetar el gasto de cuota
+_pantalla = contextvars.ContextVar('pantalla', default='-')
+
+
+def pantalla(nombre):
+    """Marca la pantalla/sección que se está pintando en el hilo actual."""
+    _pantalla.set(nombre)
+
+
+def pantalla_actual():
+    return _pantalla.get()
+
+
+MUESTRA = 16  # elementos que se miran de cada lista/dict al estimar tamaños
+
+
+def tamano_aprox(obj, _nivel=0):
+    """
+    Bytes aproximados de una carga (lo que ocuparía en JSON), sin serializarla:
+    de las listas y dicts largos se miden MUESTRA elementos repartidos y se
+    extrapola, así el coste no depende del tamaño de la hoja.
+    """
+    if obj is None or _nivel > 6:
+        return 0
+    if isinstance(obj, str):
+        return len(obj) + 2
+    if isinstance(obj, (bool, int, float)):
+        return 5
+    if isinstance(obj, dict):
+        elementos = list(obj.items()) if len(obj) <= MUESTRA else None
+        if elementos is None:
+            paso = len(obj) // MUESTRA
+            elementos = [kv for i, kv in enumerate(obj.items()) if i % paso == 0][:MUESTRA]
+        medido = sum(tamano_aprox(k, _nivel + 1) + tamano_aprox(v, _nivel + 1) + 2 for k, v in elementos)
+        return 2 + medido * len(obj) // max(len(elementos), 1)
+    if isinstance(obj, (list, tuple)):
+        if not obj:
+            return 2
+        elementos = obj if len(obj) <= MUESTRA else [obj[i * len(obj) // MUESTRA] for i in range(MUESTRA)]
+        medido = sum(tamano_aprox(e, _nivel + 1) + 1 for e in elementos)
+        return 2 + medido * len(obj) // len(elementos)
+    return len(str(obj)) + 2
+
+
+# =============================================================================
+# REGISTRO
+# =============================================================================
+
+class Histograma:
+    """Histograma acumulado con los BUCKETS fijos."""
+
+    def __init__(self):
+        self.cuentas = [0] * len(BUCKETS)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        for i, limite in enumerate(BUCKETS):
+            if valor <= limite:
+                self.cuentas[i] += 1
+        self.suma += valor
+        self.total += 1
+
+
+class Registro:
+    """Contadores e histogramas etiquetados, seguros entre hilos."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._contadores = {}
+        self._histogramas = {}
+
+    @staticmethod
+    def _clave(nombre, etiquetas):
+        return (nombre, tuple(sorted((k, str(v)) for k, v in etiquetas.items())))
+
+    def incrementar(self, nombre, valor=1, **etiquetas):
+        clave = self._clave(nombre, etiquetas)
+        with self._lock:
+            self._contadores[clave] = self._contadores.get(clave, 0) + valor
+
+    def observar(self, nombre, valor, **etiquetas):
+        clave = self._clave(nombre, etiquetas)
+        with self._lock:
+            if clave not in self._histogramas:
+                self._histogramas[clave] = Histograma()
+            self._histogramas[clave].observar(valor)
+
+    def valor(self, nombre, **etiquetas):
+        """Valor de un contador (0 si no existe)."""
+        with self._lock:
+            return self._contadores.get(self._clave(nombre, etiquetas), 0)
+
+    def total(self, nombre, **filtro):
+        """Suma de un contador sobre todas las etiquetas que cumplen el filtro."""
+        filtro = {k: str(v) for k, v in filtro.items()}
+        with self._lock:
+            return sum(
+                v for (n, etiquetas), v in self._contadores.items()
+                if n == nombre and all(dict(etiquetas).get(k) == f for k, f in filtro.items())
+            )
+
+    def reiniciar(self):
+        with self._lock:
+            self._contadores.clear()
+            self._histogramas.clear()
+
+    # -------------------------------------------------------------------------
+    # EXPORTACIÓN
+    # -------------------------------------------------------------------------
+
+    def a_dict(self):
+        with self._lock:
+            contadores = [
+                {'nombre': n, 'etiquetas': dict(e), 'valor': v}
+                for (n, e), v in sorted(self._contadores.items())
+            ]
+            histogramas = [
+                {
+                    'nombre': n,
+                    'etiquetas': dict(e),
+                    'buckets': dict(zip([str(b) for b in BUCKETS], h.cuentas)),
+                    'suma': h.suma,
+                    'total': h.total,
+                }
+                for (n, e), h in sorted(self._histogramas.items())
+            ]
+
+        # Ratio de aciertos de caché por clave: acierto es todo lo servido sin
+        # leer de Sheets en esa consulta (RESULTADOS_ACIERTO); 'degradado' (copia
+        # servida porque Sheets falló) cuenta como consulta y tiene su propio ratio
+        cache = {}
+        for c in contadores:
+            if c['nombre'] == 'padelite_cache_total':
+                r = cache.setdefault(c['etiquetas'].get('clave', ''), {'hit': 0, 'miss': 0})
+                r[c['etiquetas'].get('resultado', 'miss')] = r.get(c['etiquetas'].get('resultado', 'miss'), 0) + c['valor']
+        for r in cache.values():
+            consultas = sum(r.values())
+            aciertos = sum(r.get(k, 0) for k in RESULTADOS_ACIERTO)
+            r['ratio'] = aciertos / consultas if consultas else 0.0
+            r['ratio_degradado'] = r.get('degradado', 0) / consultas if consultas else 0.0
+
+        return {'contadores': contadores, 'histogramas': histogramas, 'cache': cache}
+
+    def a_json(self, indent=2):
+        return json.dumps(self.a_dict(), indent=indent, ensure_ascii=False)
+
+    def a_prometheus(self):
+        def etiquetas_txt(etiquetas, extra=None):
+            pares = list(etiquetas) + (extra or [])
+            if not pares:
+                return ""
+            return "{" + ",".join(f'{k}="{str(v).replace(chr(34), chr(39))}"' for k, v in pares) + "}"
+
+        lineas = []
+        with self._lock:
+            tipos_vistos = set()
+            for (n, e), v in sorted(self._contadores.items()):
+                if n not in tipos_vistos:
+                    lineas.append(f"# TYPE {n} counter")
+                    tipos_vistos.add(n)
+                lineas.append(f"{n}{etiquetas_txt(e)} {v}")
+            for (n, e), h in sorted(self._histogramas.items()):
+                if n not in tipos_vistos:
+                    lineas.append(f"# TYPE {n} histogram")
+                    tipos_vistos.add(n)
+                for limite, cuenta in zip(BUCKETS, h.cuentas):
+                    lineas.append(f"{n}_bucket{etiquetas_txt(e, [('le', limite)])} {cuenta}")
+                lineas.append(f"{n}_bucket{etiquetas_txt(e, [('le', '+Inf')])} {h.total}")
+                lineas.append(f"{n}_sum{etiquetas_txt(e)} {h.suma:.6f}")
+                lineas.append(f"{n}_count{etiquetas_txt(e)} {h.total}")
+        return "\n".join(lineas) + "\n"
+
+
+# Registro único del proceso
+registro = Registro()
+
+
+# =============================================================================
+# ARRANQUE
+# =============================================================================
+
+# {fase: segundos} del arranque en frío (solo la primera vez que ocurre cada fase)
+arranque = {}
+
+
+def anotar_arranque(fase, segundos):
+    """Guarda la duración de una fase del arranque si aún no estaba."""
+    if fase not in arranque:
+        arranque[fase] = segundos
+        registro.observar('padelite_arranque_segundos', segundos, fase=fase)
+
+
+@contextmanager
+def fase_arranque(fase):
+    """Cronometra una fase del arranque; en los reruns siguientes no anota nada."""
+    if fase in arranque:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        anotar_arranque(fase, time.perf_counter() - inicio)
+
+
+def importar(modulo):
+    """importlib.import_module cronometrado (para las importaciones diferidas)."""
+    if modulo in sys.modules:
+        return sys.modules[modulo]
+    with fase_arranque(f"import {modulo}"):
+        return importlib.import_module(modulo)
+
+
+def marcar_arranque(fase):
+    """Anota el tiempo transcurrido desde el arranque hasta ahora (una sola vez)."""
+    anotar_arranque(fase, time.perf_counter() - _INICIO)
+
+
+# =============================================================================
+# INSTRUMENTACIÓN
+# =============================================================================
+
+def medir(nombre):
+    """Decorador: latencia y errores de un método de PadelDB."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                registro.incrementar('padelite_backend_errores_total', metodo=nombre, pantalla=pantalla_actual())
+                raise
+            finally:
+                registro.observar('padelite_backend_segundos', time.perf_counter() - inicio,
+                                  metodo=nombre, pantalla=pantalla_actual())
+        return wrapper
+    return decorator
+
+
+def sin_medir(func):
+    """Excluye un método de instrumentar_clase (helpers baratos llamados por fila)."""
+    func._sin_medir = True
+    return func
+
+
+def instrumentar_clase(cls):
+    """Aplica medir() a todos los métodos (no dunder) definidos en la clase."""
+    for nombre, atributo in list(vars(cls).items()):
+        if callable(atributo) and not nombre.startswith('__') and not getattr(atributo, '_sin_medir', False):
+            setattr(cls, nombre, medir(nombre)(atributo))
+    return cls
+
+
+def registrar_llamada_sheets(op, hoja, segundos, enviados=0, recibidos=0, error=False):
+    """Anota una llamada a la API de Sheets."""
+    etiquetas = {'op': op, 'hoja': hoja, 'pantalla': pantalla_actual()}
+    registro.incrementar('padelite_sheets_llamadas_total', **etiquetas)
+    registro.observar('padelite_sheets_segundos', segundos, op=op, hoja=hoja)
+    if enviados:
+        registro.incrementar('padelite_sheets_bytes_total', enviados, op=op, hoja=hoja, direccion='enviados')
+    if recibidos:
+        registro.incrementar('padelite_sheets_bytes_total', recibidos, op=op, hoja=hoja, direccion='recibidos')
+    if error:
+        registro.incrementar('padelite_sheets_errores_total', **etiquetas)
+
+
+class HojaInstrumentada:
+    """Proxy de un Worksheet de gspread que mide cada llamada."""
+
+    def __init__(self, ws, nombre):
+        self._ws = ws
+        self._nombre = nombre
+
+    def __getattr__(self, attr):
+        valor = getattr(self._ws, attr)
+        if not callable(valor):
+            return valor
+
+        @wraps(valor)
+        def llamada(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                resultado = valor(*args, **kwargs)
+            except Exception:
+                registrar_llamada_sheets(attr, self._nombre, time.perf_counter() - inicio,
+                                         enviados=tamano_aprox([args, kwargs]), error=True)
+                raise
+            registrar_llamada_sheets(attr, self._nombre, time.perf_counter() - inicio,
+                                     enviados=tamano_aprox([args, kwargs]), recibidos=tamano_aprox(resultado))
+            return resultado
+        return llamada
+
+
+class LibroInstrumentado:
+    """Proxy de un Spreadsheet de gspread: mide worksheet() y envuelve las hojas."""
+
+    def __init__(self, libro):
+        self._libro = libro
+
+    def worksheet(self, nombre):
+        inicio = time.perf_counter()
+        try:
+            ws = self._libro.worksheet(nombre)
+        except Exception:
+            registrar_llamada_sheets('worksheet', nombre, time.perf_counter() - inicio, error=True)
+            raise
+        registrar_llamada_sheets('worksheet', nombre, time.perf_counter() - inicio)
+        return HojaInstrumentada(ws, nombre)
+
+    def __getattr__(self, attr):
+        valor = getattr(self._libro, attr)
+        if not callable(valor):
+            return valor
+
+        @wraps(valor)
+        def llamada(*args, **kwargs):
+            inicio = time.perf_counter()
+            error = False
+            resultado = None
+            try:
+                resultado = valor(*args, **kwargs)
+                return resultado
+            except Exception:
+                error = True
+                raise
+            finally:
+                registrar_llamada_sheets(attr, '*', time.perf_counter() - inicio,
+                                         enviados=tamano_aprox([args, kwargs]),
+                                         recibidos=0 if error else tamano_aprox(resultado), error=error)
+        return llamada
@@ -0,0 +1,124 @@
+"""
+PadelLite Perfilado - Perfiles por rerun (opcional)
+===================================================
+Se activa con PADELITE_PERFIL=1 (todas las sesiones) o con ?admin=<token>&perfil=1.
+Cada rerun de login/main_app se perfila y se escribe en PADELITE_PERFIL_DIR
+(por defecto ./perfiles):
+- modo 'muestreo' (por defecto): pilas plegadas (.folded) compatibles con
+  flamegraph.pl / speedscope, con la sección (calendario, partidos...) como
+  raíz y las llamadas a backend.py marcadas con un marco [backend].
+- modo 'cprofile' (PADELITE_PERFIL_MODO=cprofile): fichero .prof de pstats.
+Desactivado, seccion() es una consulta a una ContextVar y nada más.
+"""
+import contextvars
+import cProfile
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+
+INTERVALO = float(os.environ.get("PADELITE_PERFIL_INTERVALO", "0.005"))  # segundos entre muestras
+
+_activo = contextvars.ContextVar('perfil_activo', default=None)
+
+
+def activado_por_entorno():
+    return os.environ.get("PADELITE_PERFIL", "") not in ("", "0")
+
+
+def directorio():
+    return os.environ.get("PADELITE_PERFIL_DIR", "perfiles")
+
+
+def seccion(nombre):
+    """Marca la sección que se pinta a continuación (sin efecto si no se perfila)."""
+    muestreador = _activo.get()
+    if muestreador is not None:
+        muestreador.seccion = nombre
+
+
+# =============================================================================
+# MUESTREADOR
+# =============================================================================
+
+class Muestreador:
+    """Toma muestras de la pila de un hilo cada INTERVALO segundos."""
+
+    def __init__(self, hilo_id, intervalo=INTERVALO):
+        self.hilo_id = hilo_id
+        self.intervalo = intervalo
+        self.seccion = '-'
+        self.pilas = {}
+        self._parar = threading.Event()
+        self._hilo = threading.Thread(target=self._bucle, name="perfilado", daemon=True)
+
+    def start(self):
+        self._hilo.start()
+
+    def stop(self):
+        self._parar.set()
+        self._hilo.join()
+
+    def _bucle(self):
+        while not self._parar.wait(self.intervalo):
+            frame = sys._current_frames().get(self.hilo_id)
+            if frame is None:
+                continue
+            marcos = []
+            while frame is not None:
+                codigo = frame.f_code
+                fichero = os.path.basename(codigo.co_filename)
+                marcos.append(f"{codigo.co_name} ({fichero}:{codigo.co_firstlineno})")
+                if fichero == 'backend.py' and (frame.f_back is None or
+                                                os.path.basename(frame.f_back.f_code.co_filename) != 'backend.py'):
+                    marcos.append('[backend]')
+                frame = frame.f_back
+            pila = ";".join([self.seccion] + [m.replace(';', ',') for m in reversed(marcos)])
+            self.pilas[pila] = self.pilas.get(pila, 0) + 1
+
+    def guardar(self, ruta):
+        with open(ruta, 'w') as f:
+            for pila, cuenta in sorted(self.pilas.items()):
+                f.write(f"{pila} {cuenta}\n")
+
+
+# =============================================================================
+# RERUN
+# =============================================================================
+
+@contextmanager
+def perfilar_rerun(nombre, activo):
+    """Perfila el bloque (un rerun completo) si 'activo'; si no, no hace nada."""
+    if not activo:
+        yield
+        return
+
+    os.makedirs(directorio(), exist_ok=True)
+    modo = os.environ.get("PADELITE_PERFIL_MODO", "muestreo")
+    inicio = time.perf_counter()
+    marca = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+
+    if modo == 'cprofile':
+        perfil = cProfile.Profile()
+        perfil.enable()
+        try:
+            yield
+        finally:
+            perfil.disable()
+            ms = int((time.perf_counter() - inicio) * 1000)
+            perfil.dump_stats(os.path.join(directorio(), f"{marca}-{nombre}-{ms}ms.prof"))
+        return
+
+    muestreador = Muestreador(threading.get_ident())
+    token = _activo.set(muestreador)
+    muestreador.start()
+    try:
+        yield
+    finally:
+        muestreador.stop()
+        _activo.reset(token)
+        ms = int((time.perf_counter() - inicio) * 1000)
+        muestreador.guardar(os.path.join(directorio(), f"{marca}-{nombre}-{ms}ms.folded"))
@@ -0,0 +1,118 @@
+"""
+PadelLite Sesiones - Tokens de sesión firmados para el auto-login por URL
+=========================================================================
+Al entrar, la app pone en la URL ?t=<token> con el ID, nombre y nivel del
+usuario, su liga (ver ligas.py), su caducidad y la época de sesiones, firmado
+con HMAC-SHA256. Un token solo vale en la liga en la que se emitió. Al
+recargar la página o abrir una sesión nueva el token se comprueba en local,
+sin leer USUARIOS. Solo al caducar (o si sube la época) se consulta el índice
+de usuarios para renovarlo, y si el usuario ya no está activo vuelve al login.
+
+- Clave: PADELITE_CLAVE_SESION, o 'clave_sesion' en los secrets de Streamlit;
+  si no hay ninguna se deriva de la clave privada de la cuenta de servicio
+  (credentials.json, secrets o GCP_PRIVATE_KEY). Cambiarla invalida todos los
+  tokens.
+- PADELITE_SESION_DIAS: días de validez del token (por defecto 7).
+- PADELITE_EPOCA_SESION: subirla obliga a todas las sesiones a renovarse (p. ej.
+  tras desactivar usuarios con 'mantenimiento.py usuarios').
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+from functools import lru_cache
+
+import streamlit as st
+
+import ligas
+
+
+DIAS = float(os.environ.get("PADELITE_SESION_DIAS", "7"))
+
+
+def epoca():
+    return int(os.environ.get("PADELITE_EPOCA_SESION", "0"))
+
+
+@lru_cache(maxsize=1)
+def _clave():
+    """Clave del HMAC (se calcula una vez por proceso)."""
+    clave = os.environ.get("PADELITE_CLAVE_SESION", "")
+    if not clave:
+        try:
+            if hasattr(st, 'secrets') and "clave_sesion" in st.secrets:
+                clave = st.secrets["clave_sesion"]
+        except Exception:
+            pass
+    if clave:
+        return clave.encode()
+
+    privada = os.environ.get('GCP_PRIVATE_KEY', '')
+    try:
+        if os.path.exists('credentials.json'):
+            with open('credentials.json', encoding='utf-8') as f:
+                privada = json.load(f).get('private_key', '') or privada
+        elif hasattr(st, 'secrets') and "gcp_service_account" in st.secrets:
+            privada = st.secrets["gcp_service_account"].get("private_key", '') or privada
+    except Exception:
+        pass
+    if privada:
+        return hmac.new(privada.encode(), b"padelite-sesiones", hashlib.sha256).digest()
+
+    print("⚠️ Sin clave de sesión configurada: los tokens solo valen en este proceso")
+    return secrets.token_bytes(32)
+
+
+def huella(*partes):
+    """
+    HMAC-SHA256 (hex) de las partes con la clave de sesión: permite comprobar
+    un dato (p. ej. una contraseña) sin guardarlo en claro en las cachés.
+    """
+    return hmac.new(_clave(), '\0'.join(str(p) for p in partes).encode(), hashlib.sha256).hexdigest()
+
+
+def _b64(datos):
+    return base64.urlsafe_b64encode(datos).rstrip(b'=').decode()
+
+
+def _deb64(texto):
+    return base64.urlsafe_b64decode(texto + '=' * (-len(texto) % 4))
+
+
+def _firma(cuerpo):
+    return _b64(hmac.new(_clave(), cuerpo.encode(), hashlib.sha256).digest())
+
+
+def emitir(user_id, nombre, nivel, liga='', ahora=None):
+    """Token firmado para el usuario de una liga, válido DIAS días desde ahora."""
+    ahora = time.time() if ahora is None else ahora
+    carga = {'u': str(user_id), 'n': nombre, 'l': nivel, 'g': liga, 'e': int(ahora + DIAS * 86400), 'v': epoca()}
+    cuerpo = _b64(json.dumps(carga, separators=(',', ':'), ensure_ascii=False).encode())
+    return f"{cuerpo}.{_firma(cuerpo)}"
+
+
+def verificar(token, liga='', ahora=None):
+    """
+    Comprueba un token sin salir del proceso. Devuelve (usuario, id_a_renovar):
+    - token válido: ({'id', 'nombre', 'nivel'}, None)
+    - firma buena pero caducado o de una época anterior: (None, ID_USUARIO)
+    - cualquier otra cosa (manipulado, otra clave, otra liga, basura): (None, None)
+    """
+    try:
+        cuerpo, firma = str(token).split('.')
+        if not hmac.compare_digest(firma, _firma(cuerpo)):
+            return None, None
+        carga = json.loads(_deb64(cuerpo))
+        user_id = str(carga['u'])
+    except (ValueError, KeyError, TypeError):
+        return None, None
+    if carga.get('g', ligas.por_defecto()) != liga:   # los tokens sin liga son de la de por defecto
+        return None, None
+
+    ahora = time.time() if ahora is None else ahora
+    if carga.get('e', 0) <= ahora or carga.get('v') != epoca():
+        return None, user_id
+    return {'id': user_id, 'nombre': carga.get('n'), 'nivel': carga.get('l')}, None
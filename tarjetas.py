@@ -0,0 +1,116 @@
+"""
+PadelLite Tarjetas - Plantillas HTML de partidos
+================================================
+Se importa como módulo aparte para que la memoización sobreviva a los
+reruns de Streamlit (app.py se re-ejecuta entero en cada interacción).
+"""
+from functools import lru_cache
+
+
+# =============================================================================
+# ESTILOS POR TIPO DE TARJETA
+# =============================================================================
+
+ESTILOS = {
+    'disponible': {
+        'fondo': '#e3f2fd',
+        'borde': '#1E88E5',
+        'badge_fondo': '#1E88E5',
+        'badge_color': 'white',
+        'badge': 'DISPONIBLE',
+        'fecha_size': '0.75rem',
+        'nombres_style': 'font-size: 0.85rem; margin-bottom: 0.75rem; text-align: center;',
+        'vs_style': 'margin: 0.25rem 0; font-size: 0.7rem; color: #64748b; font-weight: 600;',
+    },
+    'programado': {
+        'fondo': '#f7f8cc',
+        'borde': '#D4D700',
+        'badge_fondo': '#D4D700',
+        'badge_color': '#1a1a1a',
+        'badge': 'PROGRAMADO',
+        'fecha_size': '0.75rem',
+        'nombres_style': 'font-size: 0.85rem; text-align: center;',
+        'vs_style': 'margin: 0.25rem 0; font-size: 0.7rem; color: #64748b; font-weight: 600;',
+    },
+    'jugado': {
+        'fondo': '#e2e8ed',
+        'borde': '#94a3b8',
+        'badge_fondo': '#94a3b8',
+        'badge_color': 'white',
+        'badge': 'JUGADO',
+        'fecha_size': '0.7rem',
+        'nombres_style': 'font-size: 0.8rem; text-align: center;',
+        'vs_style': 'margin: 0.1rem 0; font-size: 0.65rem; color: #94a3b8; font-weight: 600;',
+    },
+}
+
+
+# =============================================================================
+# UTILIDADES
+# =============================================================================
+
+def jugadores(partido):
+    """Devuelve los 4 nombres del partido como tupla (j1, j2, j3, j4)."""
+    nombres = partido.get('nombres')
+    if nombres and len(nombres) == 4:
+        return tuple(nombres)
+    # Datos antiguos sin campos estructurados
+    return (partido.get('nombres_str', ''), "", "", "")
+
+
+def subtitulo(tipo, partido):
+    """Texto de fecha/hora que aparece bajo el título de la tarjeta."""
+    if tipo == 'disponible':
+        coincidencias = partido.get('coincidencias', [])
+        if len(coincidencias) > 1:
+            return f"{len(coincidencias)} días disponibles"
+        primera = coincidencias[0] if coincidencias else {}
+        return f"{primera.get('fecha', '')} · {primera.get('hora_inicio', '')} - {primera.get('hora_fin', '')}"
+    if tipo == 'programado':
+        return f"{partido.get('fecha', '')} · {partido.get('hora', '')}"
+    return partido.get('fecha', '')
+
+
+# =============================================================================
+# PLANTILLAS
+# =============================================================================
+
+@lru_cache(maxsize=1024)
+def tarjeta_html(tipo, id_partido, titulo, subtitulo, nombres):
+    """
+    HTML de una tarjeta de partido.
+    Memoizada por partido y versión: la clave incluye todo lo que se pinta,
+    así que cualquier cambio (fecha, hora, jugadores...) genera una entrada nueva.
+    """
+    e = ESTILOS[tipo]
+    j1, j2, j3, j4 = nombres
+    return (
+        f"<div style='background: linear-gradient(135deg, {e['fondo']} 0%, #fff 100%); padding: 0.75rem; border-radius: 10px; margin-bottom: 0.5rem; border-left: 3px solid {e['borde']};'>"
+        f"<div style='display: flex; justify-content: space-between; align-items: center; margin-bottom: 0.5rem;'>"
+        f"<span style='font-weight: 600; font-size: 0.85rem;'>{titulo}</span>"
+        f"<span style='background: {e['badge_fondo']}; color: {e['badge_color']}; padding: 2px 8px; border-radius: 6px; font-size: 0.65rem; font-weight: 700;'>{e['badge']}</span>"
+        f"</div>"
+        f"<p style='font-size: {e['fecha_size']}; color: #64748b; margin: 0 0 0.5rem;'>{subtitulo}</p>"
+        f"<div style='{e['nombres_style']}'>"
+        f"<p style='margin: 0;'>{j1}</p>"
+        f"<p style='margin: 0;'>{j2}</p>"
+        f"<p style='{e['vs_style']}'>vs</p>"
+        f"<p style='margin: 0;'>{j3}</p>"
+        f"<p style='margin: 0;'>{j4}</p>"
+        f"</div>"
+        f"</div>"
+    )
+
+
+def seccion_html(tipo, partidos):
+    """Concatena las tarjetas de una sección para emitirlas en un único bloque."""
+    return "".join(
+        tarjeta_html(
+            tipo,
+            p.get('id_partido', ''),
+            p.get('titulo', p.get('id_partido', '')),
+            subtitulo(tipo, p),
+            jugadores(p),
+        )
+        for p in partidos
+    )